@@ -1,5 +1,14 @@
-from aws_parsecf.loaders import load_json, loads_json, load_yaml
+from aws_parsecf.loaders import load_json, loads_json, load_json_file, load_yaml, resolve, set_json_backend
 from aws_parsecf.common import UnknownValue
+from aws_parsecf.lookups import Lookups
+from aws_parsecf.plans import compile
+from aws_parsecf.lazy import view
+from aws_parsecf.dependencies import graph
+from aws_parsecf.incremental import Incremental
+from aws_parsecf.matrix import truth_tables
+from aws_parsecf.streaming import iter_resources, iter_resources_file
+from aws_parsecf.profiling import profile
+from aws_parsecf.results import ResultCache
 
-__all__ = ['load_json', 'loads_json', 'load_yaml']
+__all__ = ['load_json', 'loads_json', 'load_json_file', 'load_yaml', 'set_json_backend', 'resolve', 'compile', 'view', 'graph', 'Incremental', 'truth_tables', 'iter_resources', 'iter_resources_file', 'profile', 'ResultCache', 'Lookups']
 
@@ -0,0 +1,4 @@
+from aws_parsecf.cli import main
+import sys
+
+sys.exit(main())
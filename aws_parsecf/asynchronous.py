@@ -0,0 +1,132 @@
+from aws_parsecf.common import configured_region
+from aws_parsecf.loaders import _load, _parse_json, _parse_yaml, resolve
+from aws_parsecf.lookups import Lookups
+import asyncio
+import contextvars
+import functools
+import inspect
+
+# Like aws_parsecf.loaders but for asyncio: the Fn::GetAZs / Fn::ImportValue values a template needs are fetched
+# concurrently first, then parsing and resolving run on executor (the event loop's default one when None), so the
+# event loop is never blocked. They run in the calling task's context, e.g. measured by its
+# aws_parsecf.profiling.profile().
+
+async def load_json_async(stream, default_region=None, parameters={}, lookups=None, executor=None):
+    """
+    stream.read() may be a coroutine (e.g. of an aiohttp request).
+    """
+
+    data = stream.read()
+    if inspect.isawaitable(data):
+        data = await data
+    return await loads_json_async(data, default_region, parameters, lookups, executor)
+
+async def loads_json_async(string_or_bytes, default_region=None, parameters={}, lookups=None, executor=None):
+    """
+    >>> import json, threading
+    >>> from aws_parsecf.lookups import AvailabilityZonesCache, ExportsCache
+
+    Fetches that only return once all 4 of them are running:
+
+    >>> started = threading.Barrier(4, timeout=10)
+    >>> def availability_zones(region):
+    ...     started.wait()
+    ...     return [region + 'a', region + 'b']
+    >>> def exports(region):
+    ...     started.wait()
+    ...     return {'SharedVpc': 'vpc-12345678'}
+    >>> lookups = Lookups(availability_zones_cache=AvailabilityZonesCache(fetch=availability_zones),
+    ...                   exports_cache=ExportsCache(fetch=exports))
+
+    >>> template = json.dumps({'Outputs': {
+    ...     'East': {'Value': {'Fn::GetAZs': ''}},
+    ...     'West': {'Value': {'Fn::GetAZs': 'us-west-2'}},
+    ...     'Europe': {'Value': {'Fn::Select': [0, {'Fn::GetAZs': 'eu-west-1'}]}},
+    ...     'Vpc': {'Value': {'Fn::ImportValue': 'SharedVpc'}}}})
+    >>> asyncio.run(loads_json_async(template, 'us-east-1', lookups=lookups))
+    {'Outputs': {'East': {'Value': ['us-east-1a', 'us-east-1b']}, 'West': {'Value': ['us-west-2a', 'us-west-2b']}, 'Europe': {'Value': 'eu-west-1a'}, 'Vpc': {'Value': 'vpc-12345678'}}}
+    """
+
+    root = await _run(executor, _parse_json, string_or_bytes)
+    return await _resolve(root, default_region, parameters, lookups, executor, _load)
+
+async def load_yaml_async(stream_or_string, default_region=None, parameters={}, lookups=None, executor=None):
+    if hasattr(stream_or_string, 'read'):
+        stream_or_string = stream_or_string.read()
+        if inspect.isawaitable(stream_or_string):
+            stream_or_string = await stream_or_string
+    root = await _run(executor, _parse_yaml, stream_or_string)
+    return await _resolve(root, default_region, parameters, lookups, executor, _load)
+
+async def resolve_async(root, default_region=None, parameters={}, lookups=None, executor=None):
+    """
+    Like aws_parsecf.resolve(), root is left untouched.
+
+    >>> template = {'Outputs': {'Zones': {'Value': {'Fn::GetAZs': {'Ref': 'AWS::Region'}}}}}
+    >>> asyncio.run(resolve_async(template, 'us-east-1', lookups=Lookups(
+    ...     availability_zones={'us-east-1': ['us-east-1a', 'us-east-1b']})))
+    {'Outputs': {'Zones': {'Value': ['us-east-1a', 'us-east-1b']}}}
+
+    >>> from aws_parsecf.profiling import profile
+    >>> with profile() as stats:
+    ...     resolved = asyncio.run(resolve_async(template, 'us-east-1', lookups=Lookups(
+    ...         availability_zones={'us-east-1': ['us-east-1a', 'us-east-1b']})))
+    >>> sorted(stats.functions)
+    ['Fn::GetAZs', 'Ref']
+    """
+
+    return await _resolve(root, default_region, parameters, lookups, executor, resolve)
+
+def needed_lookups(root, default_region):
+    """
+    (regions of Fn::GetAZs, whether Fn::ImportValue is used) of a parsed template, as far as can be told without
+    resolving it (e.g. not a region from a parameter).
+
+    >>> needed_lookups({'Resources': {'Subnet': {'Properties': {
+    ...     'AvailabilityZone': {'Fn::Select': [0, {'Fn::GetAZs': 'eu-west-1'}]},
+    ...     'Others': [{'Fn::GetAZs': ''}, {'Fn::GetAZs': {'Ref': 'SomeParameter'}}]}}}}, 'us-east-1')
+    (['eu-west-1', 'us-east-1'], False)
+    """
+
+    regions = set()
+    import_value = False
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, dict):
+            if len(current) == 1:
+                key, value = next(iter(current.items()))
+                if key == 'Fn::GetAZs':
+                    if not value or value == {'Ref': 'AWS::Region'}:
+                        if default_region:
+                            regions.add(default_region)
+                    elif isinstance(value, str):
+                        regions.add(value)
+                elif key == 'Fn::ImportValue':
+                    import_value = True
+            stack.extend(current.values())
+        elif isinstance(current, list):
+            stack.extend(current)
+    return sorted(regions), import_value
+
+async def _resolve(root, default_region, parameters, lookups, executor, load):
+    if lookups is None:
+        lookups = Lookups()
+    if default_region is None:
+        # the aws configuration is read by boto3, blocking
+        default_region = await _run(executor, configured_region) or None
+
+    regions, import_value = await _run(executor, needed_lookups, root, default_region)
+    fetches = [_run(executor, lookups.availability_zones, region) for region in regions]
+    if import_value and default_region:
+        fetches.append(_run(executor, lookups.exports, default_region))
+    # failures are left to resolving, which only fails if the value is actually used (e.g. not in the branch of an
+    # Fn::If that isn't taken)
+    await asyncio.gather(*fetches, return_exceptions=True)
+
+    return await _run(executor, load, root, default_region, parameters, lookups)
+
+def _run(executor, function, *args):
+    # run_in_executor doesn't pass on the task's context (unlike asyncio.to_thread, which has no executor=)
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(executor, functools.partial(contextvars.copy_context().run, function, *args))
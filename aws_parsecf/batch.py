@@ -0,0 +1,155 @@
+from aws_parsecf.common import configured_region
+from aws_parsecf.loaders import load_json_file, load_yaml, loads_json
+from aws_parsecf.lookups import Lookups
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# item as given, and either the resolved template or the exception resolving it raised
+Result = namedtuple('Result', ['item', 'resolved', 'error'])
+
+def resolve_files(items, default_region=None, parameters={}, lookups=None, max_workers=None):
+    """
+    Resolves many template files on a process pool, yielding a Result per item in completion order.
+
+    Each item is a path, or a (path, default_region, parameters) tuple overriding the defaults. Files
+    ending with .json are loaded as JSON, anything else as YAML. With max_workers=0, they're resolved one by one in
+    this process instead (e.g. to profile them).
+    """
+
+    return _batch(items, True, default_region, parameters, lookups, max_workers)
+
+def resolve_strings(items, default_region=None, parameters={}, lookups=None, max_workers=None):
+    """
+    Like resolve_files() but each item is a template string (JSON if it starts with '{', YAML otherwise), or a
+    (string, default_region, parameters) tuple.
+
+    >>> from aws_parsecf.lookups import Lookups
+
+    >>> results = resolve_strings([
+    ...     '{"Outputs": {"Zones": {"Value": {"Fn::GetAZs": ""}}}}',
+    ...     ('{"Outputs": {"Vpc": {"Value": {"Fn::ImportValue": "SharedVpc"}}}}', 'us-west-2', {}),
+    ...     '{"Outputs": ',
+    ...     ], 'us-east-1', lookups=Lookups(availability_zones={'us-east-1': ['us-east-1a', 'us-east-1b']},
+    ...                                     exports={'us-west-2': {'SharedVpc': 'vpc-12345678'}}))
+    >>> for result in sorted(results, key=lambda result: str(result.item)):
+    ...     print(result.resolved, type(result.error).__name__)
+    {'Outputs': {'Vpc': {'Value': 'vpc-12345678'}}} NoneType
+    None JSONDecodeError
+    {'Outputs': {'Zones': {'Value': ['us-east-1a', 'us-east-1b']}}} NoneType
+    """
+
+    return _batch(items, False, default_region, parameters, lookups, max_workers)
+
+def _batch(items, from_files, default_region, parameters, lookups, max_workers):
+    items = list(items)
+    arguments = [_arguments(item, from_files, default_region, parameters) for item in items]
+    if lookups is None:
+        lookups = Lookups()
+    # shared lookups are fetched once here, instead of once per worker
+    _prefetch(arguments, lookups)
+
+    if max_workers == 0:
+        for item, (source, _, _, item_region, item_parameters) in zip(items, arguments):
+            try:
+                yield Result(item, _resolve(source, from_files, item_region, item_parameters, lookups), None)
+            except Exception as e:
+                yield Result(item, None, e)
+        return
+
+    with ProcessPoolExecutor(max_workers, initializer=_initialize, initargs=(lookups.snapshot(),)) as executor:
+        futures = dict(
+                (executor.submit(_resolve, source, from_files, item_region, item_parameters), item)
+                for item, (source, _, _, item_region, item_parameters) in zip(items, arguments))
+        for future in as_completed(futures):
+            try:
+                yield Result(futures[future], future.result(), None)
+            except Exception as e:
+                yield Result(futures[future], None, e)
+
+# what _prefetch() looks for, with the YAML short forms
+_GET_AZS = ('Fn::GetAZs', '!GetAZs')
+_IMPORT_VALUE = ('Fn::ImportValue', '!ImportValue')
+
+def _arguments(item, from_files, default_region, parameters):
+    # (source, uses Fn::GetAZs, uses Fn::ImportValue, default_region, parameters)
+    if isinstance(item, tuple):
+        source, default_region, parameters = item
+    else:
+        source = item
+    if from_files:
+        get_azs, import_value = _search_file(source)
+    else:
+        get_azs = any(marker in source for marker in _GET_AZS)
+        import_value = any(marker in source for marker in _IMPORT_VALUE)
+    return source, get_azs, import_value, default_region, parameters
+
+def _search_file(path, chunk_size=1 << 20):
+    """
+    (uses Fn::GetAZs, uses Fn::ImportValue) of a template file, read a chunk at a time.
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'template.yaml')
+    >>> with open(path, 'w') as f:
+    ...     _ = f.write('Outputs:\\n  Vpc:\\n    Value: !ImportValue SharedVpc\\n')
+    >>> _search_file(path, chunk_size=8)
+    (False, True)
+    """
+
+    markers = [[marker.encode('utf-8') for marker in markers] for markers in (_GET_AZS, _IMPORT_VALUE)]
+    found = [False, False]
+    # the end of the previous chunk, so markers across chunks are found too
+    overlap = max(len(marker) for marker in markers[0] + markers[1]) - 1
+    tail = b''
+    try:
+        with open(path, 'rb') as f:
+            while not all(found):
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                data = tail + chunk
+                for index, kind in enumerate(markers):
+                    found[index] = found[index] or any(marker in data for marker in kind)
+                tail = data[-overlap:]
+    except (IOError, OSError):
+        pass # reported by the worker
+    return tuple(found)
+
+def _prefetch(arguments, lookups):
+    # a plain text search, parsing every template twice would cost more than it saves (and also matches the YAML
+    # short forms), regions other than the default one are fetched by the workers
+    configured = []
+    for source, get_azs, import_value, default_region, parameters in arguments:
+        if not get_azs and not import_value:
+            continue
+        if default_region is None:
+            if not configured:
+                configured.append(configured_region())
+            default_region = configured[0]
+        if not default_region:
+            continue
+        try:
+            if get_azs:
+                lookups.availability_zones(default_region)
+            if import_value:
+                lookups.exports(default_region)
+        except Exception:
+            pass # reported by the worker
+
+# lookups of the worker process, see _initialize
+_lookups = None
+
+def _initialize(snapshot):
+    global _lookups
+    _lookups = Lookups(**snapshot)
+
+def _resolve(source, from_file, default_region, parameters, lookups=None):
+    if lookups is None:
+        lookups = _lookups
+    if from_file:
+        if source.endswith('.json'):
+            return load_json_file(source, default_region, parameters, lookups)
+        with open(source, 'r') as f:
+            return load_yaml(f, default_region, parameters, lookups)
+    if source.lstrip().startswith('{'):
+        return loads_json(source, default_region, parameters, lookups)
+    return load_yaml(source, default_region, parameters, lookups)
@@ -0,0 +1,62 @@
+from aws_parsecf import profiling
+from aws_parsecf.batch import resolve_files
+import argparse
+import json
+import sys
+
+def main(argv=None):
+    """
+    Resolves template files in parallel, printing a JSON object per template (in completion order) to stdout.
+
+    aws-parsecf [--region REGION] [--parameter NAME=VALUE ...] [--jobs N] [--profile [N]] TEMPLATE...
+    """
+
+    arguments = argparse.ArgumentParser(prog='aws-parsecf', description="Parse AWS CloudFormation's intrinsic functions in templates")
+    arguments.add_argument('templates', nargs='+', metavar='TEMPLATE', help="JSON (.json) or YAML template files")
+    arguments.add_argument('--region', help="defaults to the region in the aws configuration")
+    arguments.add_argument('--parameter', action='append', default=[], metavar='NAME=VALUE', help="template parameter, can be repeated")
+    arguments.add_argument('--jobs', type=int, help="worker processes, defaults to the number of CPUs")
+    arguments.add_argument('--profile', type=int, nargs='?', const=10, metavar='N',
+                           help="resolve in this process and print the N (10) hottest functions and entries to stderr")
+    options = arguments.parse_args(argv)
+
+    parameters = {}
+    for parameter in options.parameter:
+        name, separator, value = parameter.partition('=')
+        if not separator:
+            arguments.error("--parameter should be NAME=VALUE, not {!r}".format(parameter))
+        parameters[name] = value
+
+    if options.profile is not None:
+        with profiling.profile() as stats:
+            failed = _print(resolve_files(options.templates, options.region, parameters, max_workers=0))
+        sys.stderr.write(stats.report(options.profile) + '\n')
+    else:
+        failed = _print(resolve_files(options.templates, options.region, parameters, max_workers=options.jobs))
+    return 1 if failed else 0
+
+def _print(results):
+    """
+    >>> import datetime
+    >>> from aws_parsecf.batch import Result
+    >>> _print([Result('t.yaml', {'AWSTemplateFormatVersion': datetime.date(2010, 9, 9)}, None),
+    ...         Result('t.json', None, ValueError("Expecting value"))])
+    {"resolved": {"AWSTemplateFormatVersion": "2010-09-09"}, "template": "t.yaml"}
+    {"error": "ValueError: Expecting value", "template": "t.json"}
+    True
+    """
+
+    failed = False
+    for result in results:
+        error = result.error
+        if error is None:
+            try:
+                # YAML gives dates for unquoted ones (e.g. AWSTemplateFormatVersion: 2010-09-09)
+                print(json.dumps({'template': result.item, 'resolved': result.resolved}, sort_keys=True, default=str))
+            except (TypeError, ValueError) as e:
+                error = e
+        if error is not None:
+            failed = True
+            print(json.dumps({'template': result.item, 'error': "{}: {}".format(type(error).__name__, error)}, sort_keys=True))
+        sys.stdout.flush()
+    return failed
@@ -1,12 +1,75 @@
 class Delete:
+    """
+    What's removed from the resolved template (e.g. AWS::NoValue), a singleton compared with `is`, also through
+    copies and pickling:
+
+    >>> import copy, pickle
+    >>> Delete() is DELETE and copy.deepcopy(DELETE) is DELETE and pickle.loads(pickle.dumps(DELETE)) is DELETE
+    True
+    """
+
+    __slots__ = ()
+
+    def __new__(cls):
+        return DELETE
+
     def __repr__(self):
         return 'DELETE'
 
-DELETE = Delete()
+    def __reduce__(self):
+        return 'DELETE'
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+DELETE = object.__new__(Delete)
 
 class UnknownValue(str):
+    """
+    "UNKNOWN key", for what can't be resolved (e.g. Fn::GetAtt of a resource not created yet). Without a __dict__,
+    and interned by key so the same unknown is one object wherever it's used:
+
+    >>> UnknownValue('ATT: SomeResource.Arn') is UnknownValue('ATT: SomeResource.Arn')
+    True
+    >>> UnknownValue('ATT: SomeResource.Arn').key
+    'ATT: SomeResource.Arn'
+    """
+
+    __slots__ = ()
+    # len("UNKNOWN ")
+    PREFIX_LENGTH = 8
+
     def __new__(cls, key):
-        obj = str.__new__(cls, "UNKNOWN {}".format(key))
-        obj.key = key
+        obj = _unknown_values.get(key)
+        if obj is None:
+            if len(_unknown_values) >= UNKNOWN_VALUES_INTERNED:
+                # long running processes don't keep every unknown they saw
+                _unknown_values.clear()
+            obj = _unknown_values[key] = str.__new__(cls, "UNKNOWN {}".format(key))
         return obj
 
+    @property
+    def key(self):
+        return self[UnknownValue.PREFIX_LENGTH:]
+
+    def __getnewargs__(self):
+        # pickled by key (e.g. to send results between processes), not by the formatted string
+        return (self.key,)
+
+# key -> UnknownValue, up to UNKNOWN_VALUES_INTERNED of them
+_unknown_values = {}
+UNKNOWN_VALUES_INTERNED = 100000
+
+class CycleError(ValueError):
+    # cycle is a list of (section, name) entries, the first one repeated at the end
+    def __init__(self, cycle):
+        ValueError.__init__(self, "Circular dependency: {}".format(' -> '.join('.'.join(entry) for entry in cycle)))
+        self.cycle = cycle
+
+def configured_region():
+    # boto3 takes a while to import and reads the whole configuration chain, only pay for it when needed
+    import boto3
+    return boto3.Session().region_name
@@ -1,10 +1,16 @@
-from aws_parsecf.common import DELETE
+from aws_parsecf.common import DELETE, CycleError
 
 class Conditions:
     def __init__(self, parser, root, default_region):
         self.parser = parser
         self.root = root
         self.default_region = default_region
+        # condition type -> bound method (see Conditions.MAP)
+        self.handlers = dict((condition_type, getattr(self, method)) for condition_type, method in Conditions.MAP.items())
+        # condition name -> bool
+        self._values = {}
+        # names being evaluated, outermost first
+        self._evaluating = []
 
     MAP = {
             'Condition': 'evaluate',
@@ -15,9 +21,31 @@ class Conditions:
             }
 
     def evaluate(self, condition):
+        """
+        Named conditions are evaluated once, straight from the template so Fn::And / Fn::Or short-circuit.
+
+        >>> from aws_parsecf.parser import Parser
+        >>> root = {'Parameters': {'Stage': {'Type': 'String', 'Default': 'dev'}},
+        ...         'Conditions': {'IsProd': {'Fn::Equals': [{'Ref': 'Stage'}, 'prod']},
+        ...                        'IsProdEast': {'Fn::And': [{'Condition': 'IsProd'},
+        ...                                                   {'Fn::Equals': [{'Fn::Select': [5, []]}, 'never']}]},
+        ...                        'Loop': {'Fn::Not': [{'Condition': 'Around'}]},
+        ...                        'Around': {'Fn::Or': [{'Condition': 'Loop'}]}}}
+        >>> conditions = Parser(root, 'us-east-1', in_place=False).conditions
+        >>> conditions.evaluate('IsProdEast')
+        False
+        >>> conditions.evaluate('Loop')
+        Traceback (most recent call last):
+            ...
+        aws_parsecf.common.CycleError: Circular dependency: Conditions.Loop -> Conditions.Around -> Conditions.Loop
+        """
+
         if isinstance(condition, str):
             # condition name
-            condition = self.parser.exploded(self.root['Conditions'], condition)
+            value = self._values.get(condition)
+            if value is None:
+                value = self._evaluate_name(condition)
+            return value
         if isinstance(condition, bool):
             # already evaluated
             return condition
@@ -25,9 +53,39 @@ class Conditions:
             # type 'Condition' that was already evaluated
             return False
 
-        # single-value dict with key as the type (see Conditions.MAP)
-        condition_type, value = next(iter(condition.items()))
-        return getattr(self, Conditions.MAP[condition_type])(value)
+        # single-value dict with key as the type (see Conditions.MAP), '_exploded' if being exploded in place
+        condition_type, value = next((key, value) for key, value in condition.items() if key != '_exploded')
+        if condition_type == 'Fn::Equals' and any(isinstance(part, (dict, list)) for part in value):
+            # possibly intrinsic functions (e.g. Ref), unless the parser already resolved them
+            value = [self.parser.exploded(value, index) for index in range(len(value))]
+        return self.handlers[condition_type](value)
+
+    def evaluate_all(self):
+        """
+        {condition name: bool} of all the named conditions.
+        """
+
+        return dict((name, self.evaluate(name)) for name in self.root.get('Conditions', ()))
+
+    def _evaluate_name(self, name):
+        if name in self._evaluating:
+            cycle = self._evaluating[self._evaluating.index(name):] + [name]
+            raise CycleError([('Conditions', name) for name in cycle])
+        node = self.root['Conditions'][name]
+        # e.g. cached by a Plan
+        value = self.parser.memoized(node)
+        if value is not None:
+            self._values[name] = value
+            return value
+        self._evaluating.append(name)
+        try:
+            value = self.evaluate(node)
+        finally:
+            self._evaluating.pop()
+        self._values[name] = value
+        # so the parser doesn't evaluate it again for the Conditions section
+        self.parser.evaluated(self.root['Conditions'], name, value)
+        return value
 
     def fn_and(self, value):
         """
@@ -0,0 +1,266 @@
+from aws_parsecf.common import CycleError
+from aws_parsecf.functions import compile_sub
+from aws_parsecf.parser import Parser
+import heapq
+
+def graph(template):
+    """
+    The dependency graph of a parsed template's top-level entries (see Graph).
+
+    >>> template = {
+    ...     'Parameters': {'Stage': {'Type': 'String', 'Default': 'dev'}},
+    ...     'Conditions': {'IsProd': {'Fn::Equals': [{'Ref': 'Stage'}, 'prod']}},
+    ...     'Resources': {
+    ...         'Queue': {'Type': 'AWS::SQS::Queue', 'Properties': {'QueueName': {'Fn::Sub': 'queue-${Stage}'}}},
+    ...         'Function': {'Type': 'AWS::Lambda::Function', 'DependsOn': 'Role', 'Properties': {
+    ...             'MemorySize': {'Fn::If': ['IsProd', 1024, 128]},
+    ...             'Environment': {'Variables': {'QUEUE': {'Fn::GetAtt': ['Queue', 'Arn']}}}}},
+    ...         'Role': {'Type': 'AWS::IAM::Role'}},
+    ...     'Outputs': {'FunctionName': {'Value': {'Ref': 'Function'}}}}
+    >>> dependencies = graph(template)
+    >>> sorted(dependencies.dependencies(('Resources', 'Function')))
+    [('Conditions', 'IsProd'), ('Resources', 'Queue'), ('Resources', 'Role')]
+    >>> sorted(dependencies.blast_radius(('Parameters', 'Stage')))
+    [('Conditions', 'IsProd'), ('Outputs', 'FunctionName'), ('Resources', 'Function'), ('Resources', 'Queue')]
+    >>> [name for section, name in dependencies.order() if section == 'Resources']
+    ['Queue', 'Role', 'Function']
+    >>> dependencies.resolve('us-east-1')['Resources']['Function']['Properties']['MemorySize']
+    128
+
+    >>> template['Resources']['Role']['Properties'] = {'Path': {'Fn::GetAtt': ['Function', 'Arn']}}
+    >>> graph(template).order()
+    Traceback (most recent call last):
+        ...
+    aws_parsecf.common.CycleError: Circular dependency: Resources.Function -> Resources.Role -> Resources.Function
+    """
+
+    return Graph(template)
+
+class Graph:
+    """
+    What each top-level entry of a template, a (section, name) tuple like ('Resources', 'SomeBucket'), depends on,
+    found in one pass without resolving anything:
+
+    - references: entries used by Ref, Fn::GetAtt, Fn::Sub variables, Fn::If, Fn::FindInMap and Condition
+    - depends_on: resources in DependsOn, which only order the resources
+    - regional: entries using the region (Ref AWS::Region, Fn::GetAZs, Fn::ImportValue)
+    - dynamic: entries with references that can't be known without resolving (e.g. Ref to an Fn::Sub), which may
+      depend on anything
+    """
+
+    def __init__(self, template):
+        self.template = template
+        # entry -> set of entries
+        self.references = {}
+        self.depends_on = {}
+        self.regional = set()
+        self.dynamic = set()
+        for section, entries in template.items():
+            if not isinstance(entries, dict):
+                continue
+            for name, node in entries.items():
+                entry = (section, name)
+                self._add(entry, node)
+                self.depends_on[entry] = self._depends_on(node) if section == 'Resources' else set()
+        # entry -> set of entries depending on it
+        self._dependents = dict((entry, set()) for entry in self.references)
+        for entry in self.references:
+            for dependency in self.dependencies(entry):
+                self._dependents[dependency].add(entry)
+
+    def update(self, entry):
+        """
+        Scans entry again, after it was edited in place.
+        """
+
+        for dependency in self.dependencies(entry):
+            self._dependents[dependency].discard(entry)
+        self.regional.discard(entry)
+        self.dynamic.discard(entry)
+        section, name = entry
+        node = self.template[section][name]
+        self._add(entry, node)
+        self.depends_on[entry] = self._depends_on(node) if section == 'Resources' else set()
+        for dependency in self.dependencies(entry):
+            self._dependents[dependency].add(entry)
+
+    def dependencies(self, entry):
+        """
+        Entries that entry directly depends on.
+        """
+
+        return (self.references[entry] | self.depends_on[entry]) & self._dependents.keys()
+
+    def dependents(self, entry):
+        """
+        Entries that directly depend on entry.
+        """
+
+        return self._dependents[entry]
+
+    def requires(self, entry):
+        """
+        Entries that entry transitively depends on.
+        """
+
+        return self._closure(entry, self.dependencies)
+
+    def blast_radius(self, entry):
+        """
+        Entries that transitively depend on entry, i.e. may change when it does.
+        """
+
+        return self._closure(entry, self.dependents)
+
+    def order(self):
+        """
+        All entries, each after its dependencies. Raises CycleError if there's a circular dependency (including an
+        entry depending on itself).
+        """
+
+        # Kahn's algorithm, the earliest ready entry (in template order) first so the order is stable
+        position = dict((entry, index) for index, entry in enumerate(self.references))
+        remaining = dict((entry, len(self.dependencies(entry))) for entry in self.references)
+        ready = [(position[entry], entry) for entry, count in remaining.items() if not count]
+        heapq.heapify(ready)
+        ordered = []
+        while ready:
+            _, entry = heapq.heappop(ready)
+            ordered.append(entry)
+            del remaining[entry]
+            for dependent in self._dependents[entry]:
+                remaining[dependent] -= 1
+                if not remaining[dependent]:
+                    heapq.heappush(ready, (position[dependent], dependent))
+        if remaining:
+            raise CycleError(self._cycle(remaining))
+        return ordered
+
+    def resolve(self, default_region=None, parameters={}, lookups=None):
+        """
+        Same as aws_parsecf.resolve(template, default_region, parameters, lookups), but checks for circular
+        dependencies first and resolves the entries in order, so each one finds its dependencies already resolved.
+        """
+
+        parser = Parser(self.template, default_region, parameters, in_place=False, lookups=lookups)
+        for section, name in self.order():
+            parser.exploded(self.template[section], name)
+        return parser.resolve(self.template)
+
+    def scan(self, node):
+        """
+        (references, regional, dynamic) of node, which may be any part of the template, see scan().
+        """
+
+        return scan(self.template, node)
+
+    def _add(self, entry, node):
+        self.references[entry], regional, dynamic = self.scan(node)
+        if regional:
+            self.regional.add(entry)
+        if dynamic:
+            self.dynamic.add(entry)
+
+    @staticmethod
+    def _depends_on(resource):
+        depends_on = resource.get('DependsOn') if isinstance(resource, dict) else None
+        if isinstance(depends_on, str):
+            return {('Resources', depends_on)}
+        elif isinstance(depends_on, list):
+            return set(('Resources', name) for name in depends_on if isinstance(name, str))
+        return set()
+
+    @staticmethod
+    def _closure(entry, neighbors):
+        found = set()
+        stack = [entry]
+        while stack:
+            for neighbor in neighbors(stack.pop()):
+                if neighbor not in found:
+                    found.add(neighbor)
+                    stack.append(neighbor)
+        return found
+
+    def _cycle(self, remaining):
+        # every remaining entry has a remaining dependency, so following them must loop
+        entry = min(remaining)
+        path = []
+        seen = {}
+        while entry not in seen:
+            seen[entry] = len(path)
+            path.append(entry)
+            entry = min(dependency for dependency in self.dependencies(entry) if dependency in remaining)
+        return path[seen[entry]:] + [entry]
+
+def scan(template, node):
+    """
+    (references, regional, dynamic) of node, which may be any part of template (see Graph), with template only
+    telling the parameters and resources apart, so it may be partial.
+
+    >>> template = {'Parameters': {'Stage': {'Type': 'String'}}, 'Resources': {'Queue': {'Type': 'AWS::SQS::Queue'}}}
+    >>> references, regional, dynamic = scan(template, {'Fn::Sub': '${Stage}-${Queue.Arn}-${AWS::Region}'})
+    >>> sorted(references), regional, dynamic
+    ([('Parameters', 'Stage'), ('Resources', 'Queue')], True, False)
+    """
+
+    references = set()
+    regional = False
+    dynamic = False
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, list):
+            stack.extend(current)
+            continue
+        elif not isinstance(current, dict):
+            continue
+        stack.extend(current.values())
+
+        condition_name = current.get('Condition')
+        if isinstance(condition_name, str):
+            references.add(('Conditions', condition_name))
+        if len(current) != 1:
+            continue
+        key, value = next(iter(current.items()))
+        if key == 'Ref':
+            if isinstance(value, str):
+                regional = _reference(template, value, references) or regional
+            else:
+                dynamic = True
+        elif key == 'Fn::GetAtt':
+            if isinstance(value, list) and value and isinstance(value[0], str):
+                references.add(('Resources', value[0]))
+            else:
+                dynamic = True
+        elif key == 'Fn::Sub':
+            string, variables = value if isinstance(value, list) and len(value) == 2 else (value, {})
+            if isinstance(string, str) and isinstance(variables, dict):
+                for variable in compile_sub(string)[1::2]:
+                    if variable not in variables:
+                        regional = _reference(template, variable.split('.')[0], references) or regional
+            else:
+                dynamic = True
+        elif key == 'Fn::If':
+            if isinstance(value, list) and value and isinstance(value[0], str):
+                references.add(('Conditions', value[0]))
+            else:
+                dynamic = True
+        elif key == 'Fn::FindInMap':
+            if isinstance(value, list) and value and isinstance(value[0], str):
+                references.add(('Mappings', value[0]))
+            else:
+                references.update(('Mappings', name) for name in template.get('Mappings', ()))
+        elif key in ('Fn::GetAZs', 'Fn::ImportValue'):
+            # looked up in the (default) region
+            regional = True
+    return references, regional, dynamic
+
+def _reference(template, name, references):
+    # same precedence as Functions.ref, True for the region
+    if name == 'AWS::Region':
+        return True
+    elif name in template.get('Parameters', ()):
+        references.add(('Parameters', name))
+    elif name in template.get('Resources', ()):
+        references.add(('Resources', name))
+    return False
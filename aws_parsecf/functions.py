@@ -1,14 +1,35 @@
-from aws_parsecf.common import DELETE, UnknownValue
+from aws_parsecf.common import DELETE, UnknownValue, configured_region
+from aws_parsecf.lookups import Lookups
 import base64
-import boto3
+import functools
 import re
 
 class Functions:
-    def __init__(self, parser, root, default_region, parameters={}):
+    def __init__(self, parser, root, default_region, parameters={}, lookups=None):
         self.parser = parser
         self.root = root
-        self.default_region = default_region
+        self._default_region = default_region
         self.parameters = parameters
+        self.lookups = lookups if lookups is not None else Lookups()
+        # resource name -> {attribute name: value}, see _attributes()
+        self._attributes_cache = {}
+        # function type -> bound method (see Functions.MAP)
+        self.handlers = dict((function_type, getattr(self, method)) for function_type, method in Functions.MAP.items())
+
+    @property
+    def default_region(self):
+        """
+        Resolved from the aws configuration only when a template actually needs it.
+
+        >>> Functions(None, {}, 'us-west-2').default_region
+        'us-west-2'
+        """
+
+        if self._default_region is None:
+            self._default_region = configured_region()
+        if not self._default_region:
+            raise TypeError("No default region in aws configuration, please specify one (with `aws configure` or `default_region=`)")
+        return self._default_region
 
     MAP = {
         'Fn::Base64': 'fn_base64',
@@ -25,14 +46,14 @@ class Functions:
     }
 
     def evaluate(self, function_type, value):
-        return getattr(self, Functions.MAP[function_type])(value)
+        return self.handlers[function_type](value)
 
     def fn_base64(self, value):
         """
-        >>> str(Functions(None, # 2.7 represents this as u'...'
+        >>> Functions(None,
         ...     {'Fn::Base64': 'hello'},
         ...     'us-east-1'
-        ...     ).fn_base64('hello'))
+        ...     ).fn_base64('hello')
         'aGVsbG8='
         """
         if isinstance(value, str):
@@ -118,6 +139,16 @@ class Functions:
         ...     ).fn_get_att(['SomeResource', 'SomeKey'])
         'SomeValue'
 
+        >>> root = {'Resources':
+        ...             {'SomeResource': {'Properties': {'List': [{'Nested': {'SomeKey': 'Deeper'}}, {'SomeKey': 'Later'}],
+        ...                                              'Other': {'SomeKey': 'Last'}}}},
+        ...         'Fn::GetAtt': ['SomeResource', 'SomeKey']}
+        >>> Functions(Parser(root, 'us-east-1'),
+        ...     root,
+        ...     'us-east-1'
+        ...     ).fn_get_att(['SomeResource', 'SomeKey'])
+        'Deeper'
+
         >>> root = {'Fn::GetAtt': ['SomeResource', 'SomeKey']}
         >>> Functions(Parser(root, 'us-east-1'),
         ...     root,
@@ -136,12 +167,9 @@ class Functions:
 
         resource_name, key = value
         if resource_name in self.root.get('Resources', ()):
-            resource = self.parser.exploded(self.root['Resources'], resource_name)
-            try:
-                return self._find_att(resource, key)
-            except KeyError as e:
-                if e.args != (key,):
-                    raise
+            attributes = self._attributes(resource_name)
+            if key in attributes:
+                return attributes[key]
 
         return UnknownValue("ATT: {}.{}".format(resource_name, key))
 
@@ -165,18 +193,26 @@ class Functions:
         """
 
         # NOTE: If you change this function, please run the tests with FULL=true environment variable!
-        return [
-                zone['ZoneName'] for zone in
-                boto3.client('ec2', region_name=value or self.default_region).describe_availability_zones()['AvailabilityZones']
-                ]
+        return self.lookups.availability_zones(value or self.default_region)
 
     def fn_import_value(self, value):
-        if not hasattr(self, '_import_value_cache'):
-            self._import_value_cache = dict(
-                    (export['Name'], export['Value']) for export in
-                    boto3.client('cloudformation', region_name=self.default_region).list_exports()['Exports']
-                    )
-        return self._import_value_cache.get(value, UnknownValue("IMPORT VALUE: {}".format(value)))
+        """
+        >>> from aws_parsecf.lookups import Lookups
+
+        >>> functions = Functions(None,
+        ...     {'Fn::ImportValue': 'SharedVpc'},
+        ...     'us-east-1',
+        ...     lookups=Lookups(exports={'us-east-1': {'SharedVpc': 'vpc-12345678'}}))
+        >>> functions.fn_import_value('SharedVpc')
+        'vpc-12345678'
+        >>> functions.fn_import_value('Other')
+        'UNKNOWN IMPORT VALUE: Other'
+        """
+
+        exports = self.lookups.exports(self.default_region)
+        if value in exports:
+            return exports[value]
+        return UnknownValue("IMPORT VALUE: {}".format(value))
 
     def fn_join(self, value):
         """
@@ -225,6 +261,14 @@ class Functions:
         ...     ).fn_sub(['hello-${Who} ${When}', {'Who': 'world', 'When': 'NOW'}])
         'hello-world NOW'
 
+        >>> root = {'Parameters': {'Stage': {'Type': 'String', 'Default': 'dev'}},
+        ...         'Fn::Sub': '${AWS::Region}-${Stage}-${!Literal}'}
+        >>> Functions(Parser(root, 'us-east-1'),
+        ...     root,
+        ...     'us-east-1'
+        ...     ).fn_sub('${AWS::Region}-${Stage}-${!Literal}')
+        'us-east-1-dev-${Literal}'
+
         >>> root = {'Fn::Sub': 'hello world'}
         >>> Functions(Parser(root, 'us-east-1'),
         ...     root,
@@ -257,10 +301,20 @@ class Functions:
             # only template parameter names, resource logical IDs, and resource attributes, will be parsed
             value, variables = value, {}
 
-        for name, target in variables.items():
-            value = value.replace('${{{}}}'.format(name), target)
-
-        return Functions.SUB_VARIABLE_PATTERN.sub(self._sub_variable, value)
+        segments = compile_sub(value)
+        if len(segments) == 1:
+            return segments[0]
+        # literals at even indexes, variable names at odd ones
+        parts = list(segments)
+        for index in range(1, len(parts), 2):
+            name = parts[index]
+            if name in variables:
+                parts[index] = variables[name]
+            elif '.' in name:
+                parts[index] = self.fn_get_att(name.split('.', 1))
+            else:
+                parts[index] = self.ref(name)
+        return ''.join(parts)
 
     def ref(self, value):
         """
@@ -362,38 +416,29 @@ class Functions:
 
         return UnknownValue("REF: {}".format(value))
 
-    def _find_att(self, current, key):
-        if isinstance(current, dict):
-            if key in current:
-                return current[key]
-            for value in current.values():
-                try:
-                    result = self._find_att(value, key)
-                except KeyError as e:
-                    if e.args != (key,):
-                        raise
-                    continue
-                return result
-        elif isinstance(current, list):
-            for value in current:
-                try:
-                    result = self._find_att(value, key)
-                except KeyError as e:
-                    if e.args != (key,):
-                        raise
-                    continue
-                return result
-        raise KeyError(key)
-
-    SUB_VARIABLE_PATTERN = re.compile(r"\${(.+)}")
-    def _sub_variable(self, match):
-        variable = match.group(1)
-        if variable.startswith('!'):
-            return "${{{}}}".format(variable[1:])
-        elif '.' in variable:
-            return self.fn_get_att(variable.split('.'))
-        else:
-            return self.ref(variable)
+    def _attributes(self, resource_name):
+        attributes = self._attributes_cache.get(resource_name)
+        if attributes is None:
+            resource = self.parser.exploded(self.root['Resources'], resource_name)
+            attributes = Functions._index_attributes(resource)
+            if not self.parser.exploding(self.root['Resources'], resource_name):
+                self._attributes_cache[resource_name] = attributes
+        return attributes
+
+    @staticmethod
+    def _index_attributes(current):
+        # first found wins, in depth first order (a dict's own keys before its values')
+        attributes = {}
+        stack = [current]
+        while stack:
+            current = stack.pop()
+            if isinstance(current, dict):
+                for key, value in current.items():
+                    attributes.setdefault(key, value)
+                stack.extend(reversed(list(current.values())))
+            elif isinstance(current, list):
+                stack.extend(reversed(current))
+        return attributes
 
     REF_PSEUDO_FUNCTIONS = {
         'AWS::NoValue': lambda self: DELETE,
@@ -402,3 +447,33 @@ class Functions:
 
     REF_RESOURCE_TYPE_PATTERN = re.compile(r"^.+::(.+?)$")
 
+@functools.lru_cache(maxsize=4096)
+def compile_sub(string):
+    """
+    Fn::Sub string -> (literal, variable name, literal, ..., literal), ${!Literal} unescaped into the literals.
+    Cached, templates repeat the same strings across resources and resolutions.
+
+    >>> compile_sub('${AWS::Region}-${Stage}-${!Literal}-${Bucket.Arn}')
+    ('', 'AWS::Region', '-', 'Stage', '-${Literal}-', 'Bucket.Arn', '')
+    >>> compile_sub('no variables')
+    ('no variables',)
+    """
+
+    segments = []
+    literal = []
+    position = 0
+    for match in SUB_VARIABLE_PATTERN.finditer(string):
+        literal.append(string[position:match.start()])
+        position = match.end()
+        name = match.group(1)
+        if name.startswith('!'):
+            literal.append("${{{}}}".format(name[1:]))
+        else:
+            segments.append(''.join(literal))
+            segments.append(name)
+            literal = []
+    literal.append(string[position:])
+    segments.append(''.join(literal))
+    return tuple(segments)
+
+SUB_VARIABLE_PATTERN = re.compile(r"\${([^}]*)}")
@@ -0,0 +1,149 @@
+from aws_parsecf.common import DELETE
+from aws_parsecf.dependencies import Graph
+from aws_parsecf.parser import Parser
+
+class Incremental:
+    """
+    A template resolved once, then kept up to date through edits: only the edited entry (a resource, an output, a
+    condition...) and the entries depending on it (see aws_parsecf.dependencies.Graph) are resolved again.
+
+    >>> template = {
+    ...     'Parameters': {'Stage': {'Type': 'String', 'Default': 'dev'}},
+    ...     'Conditions': {'IsProd': {'Fn::Equals': [{'Ref': 'Stage'}, 'prod']}},
+    ...     'Resources': {
+    ...         'Queue': {'Type': 'AWS::SQS::Queue', 'Properties': {'QueueName': 'jobs'}},
+    ...         'Alarm': {'Type': 'AWS::CloudWatch::Alarm', 'Condition': 'IsProd'},
+    ...         'Function': {'Type': 'AWS::Lambda::Function', 'Properties': {
+    ...             'MemorySize': {'Fn::If': ['IsProd', 1024, 128]},
+    ...             'Environment': {'Variables': {'QUEUE': {'Fn::Sub': '${Queue.QueueName}-queue'}}}}}}}
+    >>> incremental = Incremental(template, 'us-east-1')
+    >>> incremental.resolved['Resources']['Function']['Properties']['Environment']
+    {'Variables': {'QUEUE': 'jobs-queue'}}
+    >>> incremental.replace(['Resources', 'Queue', 'Properties', 'QueueName'], 'tasks')
+    >>> incremental.resolved['Resources']['Function']['Properties']['Environment']
+    {'Variables': {'QUEUE': 'tasks-queue'}}
+    >>> incremental.patch([{'op': 'replace', 'path': '/Parameters/Stage/Default', 'value': 'prod'}])
+    >>> sorted(incremental.resolved['Resources'])
+    ['Alarm', 'Function', 'Queue']
+    >>> incremental.resolved['Resources']['Function']['Properties']['MemorySize']
+    1024
+    >>> from aws_parsecf.loaders import resolve
+    >>> incremental.resolved == resolve(template, 'us-east-1')
+    True
+
+    Named conditions are evaluated again like resolve() does, e.g. Fn::And short-circuits:
+
+    >>> template = {'Parameters': {'Stage': {'Type': 'String', 'Default': 'dev'}},
+    ...             'Conditions': {'IsProd': {'Fn::Equals': [{'Ref': 'Stage'}, 'prod']},
+    ...                            'IsProdEast': {'Fn::And': [{'Condition': 'IsProd'},
+    ...                                                       {'Fn::Equals': [{'Fn::Select': [5, []]}, 'never']}]}}}
+    >>> incremental = Incremental(template, 'us-east-1')
+    >>> incremental.replace(['Parameters', 'Stage', 'Default'], 'qa')
+    >>> incremental.resolved['Conditions']
+    {'IsProd': False, 'IsProdEast': False}
+    """
+
+    def __init__(self, template, default_region=None, parameters={}, lookups=None):
+        self.template = template
+        self._arguments = (default_region, parameters, lookups)
+        self._reset()
+
+    def replace(self, path, value):
+        """
+        Sets the value at path (keys / list indexes from the template root) and updates resolved.
+        """
+
+        self._edit(path, lambda parent, key: parent.__setitem__(key, value))
+
+    def add(self, path, value):
+        """
+        Like replace, but inserts into lists (at the index, or at the end for '-').
+        """
+
+        def add(parent, key):
+            if isinstance(parent, list):
+                parent.insert(len(parent) if key == '-' else key, value)
+            else:
+                parent[key] = value
+        self._edit(path, add)
+
+    def remove(self, path):
+        """
+        Removes the value at path and updates resolved.
+        """
+
+        self._edit(path, lambda parent, key: parent.__delitem__(key))
+
+    def patch(self, operations):
+        """
+        Applies a JSON Patch (RFC 6902): 'add', 'remove' and 'replace' operations, with JSON Pointer paths.
+        """
+
+        for operation in operations:
+            path = [
+                    key.replace('~1', '/').replace('~0', '~')
+                    for key in operation['path'].split('/')[1:]
+                    ]
+            if operation['op'] == 'add':
+                self.add(path, operation['value'])
+            elif operation['op'] == 'remove':
+                self.remove(path)
+            elif operation['op'] == 'replace':
+                self.replace(path, operation['value'])
+            else:
+                raise ValueError("Unsupported JSON Patch operation: {}".format(operation['op']))
+
+    def _reset(self):
+        default_region, parameters, lookups = self._arguments
+        self._parser = Parser(self.template, default_region, parameters, in_place=False, lookups=lookups)
+        self._graph = Graph(self.template)
+        self.resolved = self._parser.resolve(self.template)
+
+    def _edit(self, path, edit):
+        parent = self.template
+        keys = []
+        for key in path[:-1]:
+            if isinstance(parent, list):
+                key = int(key)
+            keys.append(key)
+            parent = parent[key]
+        key = path[-1]
+        if isinstance(parent, list) and key != '-':
+            key = int(key)
+
+        entry = tuple((keys + [key])[:2])
+        if entry not in self._graph.references or (len(keys) == 1 and key not in parent):
+            # a new section or entry may change what other entries refer to, start over
+            edit(parent, key)
+            self._reset()
+            return
+
+        affected = {entry} | self._graph.blast_radius(entry)
+        for dynamic in self._graph.dynamic:
+            affected.add(dynamic)
+            affected |= self._graph.blast_radius(dynamic)
+        # before the edit, so removed nodes are forgotten as well
+        for section, name in affected:
+            self._parser.forget(self.template[section][name])
+            if section == 'Resources':
+                self._parser.functions._attributes_cache.pop(name, None)
+            elif section == 'Conditions':
+                self._parser.conditions._values.pop(name, None)
+
+        edit(parent, key)
+        if len(keys) == 1 and key not in parent:
+            # so was the entry itself
+            self._reset()
+            return
+        self._graph.update(entry)
+
+        for section, name in affected:
+            if section == 'Conditions':
+                # like the parser does, so Fn::And / Fn::Or short-circuit
+                resolved = self._parser.conditions.evaluate(name)
+            else:
+                resolved = self._parser.resolve(self.template[section][name])
+            if resolved is DELETE:
+                self.resolved[section].pop(name, None)
+            else:
+                self.resolved[section][name] = resolved
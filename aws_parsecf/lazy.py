@@ -0,0 +1,105 @@
+from aws_parsecf.common import DELETE
+from aws_parsecf.parser import Parser
+from collections.abc import Mapping
+
+def view(template, default_region=None, parameters={}, lookups=None):
+    """
+    A read-only view of a parsed template that resolves values on access. Only the accessed subtree and what it
+    depends on (conditions, parameters, mappings, referenced resources) are resolved, each once.
+
+    >>> template = {
+    ...     'Parameters': {'Runtime': {'Type': 'String', 'Default': 'python3.6'}},
+    ...     'Conditions': {'IsEast': {'Fn::Equals': [{'Ref': 'AWS::Region'}, 'us-east-1']}},
+    ...     'Resources': {
+    ...         'SomeFunction': {'Type': 'AWS::Lambda::Function', 'Properties': {
+    ...             'Runtime': {'Ref': 'Runtime'},
+    ...             'Role': {'Fn::GetAtt': ['SomeRole', 'Arn']},
+    ...             'MemorySize': {'Fn::If': ['IsEast', 1024, {'Ref': 'AWS::NoValue'}]}}},
+    ...         'SomeRole': {'Type': 'AWS::IAM::Role', 'Properties': {'Arn': 'arn:aws:iam::123456789012:role/some'}},
+    ...         'EastOnly': {'Type': 'AWS::SNS::Topic', 'Condition': 'IsEast'},
+    ...         'Broken': {'Type': 'AWS::SNS::Topic', 'Properties': {'TopicName': {'Fn::Select': [5, []]}}}}}
+    >>> resources = view(template, 'us-west-2')['Resources']
+    >>> resources['SomeFunction']['Properties']['Runtime']
+    'python3.6'
+    >>> resources['SomeFunction']['Properties']['Role']
+    'arn:aws:iam::123456789012:role/some'
+    >>> dict(resources['SomeFunction']['Properties'])
+    {'Runtime': 'python3.6', 'Role': 'arn:aws:iam::123456789012:role/some'}
+    >>> 'EastOnly' in resources
+    False
+    >>> resources['Broken']['Type']
+    'AWS::SNS::Topic'
+    >>> resources['Broken']['Properties']['TopicName']
+    Traceback (most recent call last):
+        ...
+    IndexError: list index out of range
+
+    Named conditions are evaluated like aws_parsecf.resolve() does, e.g. Fn::And short-circuits:
+
+    >>> template = {'Parameters': {'Stage': {'Type': 'String', 'Default': 'dev'}},
+    ...             'Conditions': {'IsProd': {'Fn::Equals': [{'Ref': 'Stage'}, 'prod']},
+    ...                            'IsProdEast': {'Fn::And': [{'Condition': 'IsProd'},
+    ...                                                       {'Fn::Equals': [{'Fn::Select': [5, []]}, 'never']}]}}}
+    >>> view(template, 'us-east-1')['Conditions']['IsProdEast']
+    False
+    """
+
+    return View(Parser(template, default_region, parameters, in_place=False, lookups=lookups), template)
+
+class View(Mapping):
+    """
+    Resolves an object of the template on access: plain objects are returned as views too, anything else (intrinsic
+    functions, lists, scalars) is resolved as a whole. Keys removed by resolution (AWS::NoValue, false conditions)
+    are missing.
+
+    Resolved values are shared with the view and each other, treat them as read-only.
+    """
+
+    def __init__(self, parser, node):
+        self._parser = parser
+        self._node = node
+        # named conditions are evaluated through Conditions.evaluate, like the parser does
+        root = parser.functions.root
+        self._conditions = isinstance(root, dict) and node is root.get('Conditions')
+
+    def __getitem__(self, key):
+        value = self._value(key)
+        if value is DELETE:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        return (key for key in self._node if self._value(key) is not DELETE)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return "View({!r})".format(self._node)
+
+    def resolved(self):
+        """
+        The whole object resolved, like aws_parsecf.resolve() does.
+        """
+
+        if self._conditions:
+            return self._parser.conditions.evaluate_all()
+        return self._parser.resolve(self._node)
+
+    def _value(self, key):
+        value = self._node[key]
+        if self._conditions:
+            return self._parser.conditions.evaluate(key)
+        if isinstance(value, dict):
+            if len(value) == 1 and next(iter(value)) in self._parser.intrinsics:
+                return self._parser.resolve(value)
+            condition_name = value.get('Condition')
+            if condition_name and isinstance(condition_name, str):
+                # condition
+                if not self._parser.conditions.evaluate(condition_name):
+                    return DELETE
+            return View(self._parser, value)
+        elif isinstance(value, list):
+            # indexes depend on the items resolution removes, so resolved as a whole
+            return self._parser.resolve(value)
+        return value
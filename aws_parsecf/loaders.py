@@ -1,18 +1,110 @@
+from aws_parsecf import profiling
 from aws_parsecf.parser import Parser
-import boto3
 import json
-import yaml
+import mmap
 
-def load_json(stream, default_region=boto3.Session().region_name, parameters={}):
-    return _load(json.load(stream), default_region, parameters)
+# default_region=None means the region from the aws configuration, resolved only if the template needs it
+# lookups=None means fetching Fn::GetAZs / Fn::ImportValue values from AWS, see aws_parsecf.lookups.Lookups
+# cache=None means resolving every time, see aws_parsecf.results.ResultCache
 
-def loads_json(string, default_region=boto3.Session().region_name, parameters={}):
-    return _load(json.loads(string), default_region, parameters)
+def load_json(stream, default_region=None, parameters={}, lookups=None, cache=None):
+    return _cached(stream.read(), _parse_json, default_region, parameters, lookups, cache)
 
-def load_yaml(stream_or_string, default_region=boto3.Session().region_name, parameters={}):
-    return _load(yaml.load(stream_or_string), default_region, parameters)
+def loads_json(string_or_bytes, default_region=None, parameters={}, lookups=None, cache=None):
+    return _cached(string_or_bytes, _parse_json, default_region, parameters, lookups, cache)
 
-def _load(root, default_region, parameters={}):
+def load_json_file(path, default_region=None, parameters={}, lookups=None, cache=None):
+    """
+    Like load_json but for a path, memory mapped instead of read into a decoded string, for large templates.
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'template.json')
+    >>> with open(path, 'w') as f:
+    ...     _ = f.write('{"Outputs": {"Region": {"Value": {"Ref": "AWS::Region"}}}}')
+    >>> load_json_file(path, 'us-east-1')
+    {'Outputs': {'Region': {'Value': 'us-east-1'}}}
+    """
+
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file, can't be mapped
+            return loads_json(f.read(), default_region, parameters, lookups, cache)
+        with mapped:
+            return _cached(mapped, _parse_json, default_region, parameters, lookups, cache)
+
+def load_yaml(stream_or_string, default_region=None, parameters={}, lookups=None, cache=None):
+    """
+    Short forms are supported too, see aws_parsecf.yaml_loader.Loader.
+
+    >>> load_yaml('''
+    ... Resources:
+    ...   SomeBucket:
+    ...     Type: AWS::S3::Bucket
+    ...     Properties:
+    ...       BucketName: !Join [-, [!Ref AWS::Region, bucket]]
+    ... ''', 'us-east-1')
+    {'Resources': {'SomeBucket': {'Type': 'AWS::S3::Bucket', 'Properties': {'BucketName': 'us-east-1-bucket'}}}}
+    """
+
+    if cache is not None and hasattr(stream_or_string, 'read'):
+        # hashed first
+        stream_or_string = stream_or_string.read()
+    return _cached(stream_or_string, _parse_yaml, default_region, parameters, lookups, cache)
+
+def resolve(root, default_region=None, parameters={}, lookups=None):
+    """
+    Like the load_* functions but for an already parsed template, which is left untouched so it can be
+    resolved many times.
+
+    >>> template = {'Resources': {'SomeBucket': {'Type': 'AWS::S3::Bucket',
+    ...                                          'Properties': {'BucketName': {'Fn::Sub': 'bucket-${AWS::Region}'}}}}}
+    >>> resolve(template, 'us-east-1')
+    {'Resources': {'SomeBucket': {'Type': 'AWS::S3::Bucket', 'Properties': {'BucketName': 'bucket-us-east-1'}}}}
+    >>> resolve(template, 'us-west-2')
+    {'Resources': {'SomeBucket': {'Type': 'AWS::S3::Bucket', 'Properties': {'BucketName': 'bucket-us-west-2'}}}}
+
+    Named conditions are evaluated like conditions() does, Fn::And / Fn::Or short-circuiting:
+
+    >>> resolve({'Parameters': {'Stage': {'Type': 'String', 'Default': 'dev'}},
+    ...          'Conditions': {'IsProd': {'Fn::Equals': [{'Ref': 'Stage'}, 'prod']},
+    ...                         'IsProdEast': {'Fn::And': [{'Condition': 'IsProd'},
+    ...                                                    {'Fn::Equals': [{'Fn::Select': [5, []]}, 'never']}]}}},
+    ...         'us-east-1')['Conditions']
+    {'IsProd': False, 'IsProdEast': False}
+    """
+
+    return Parser(root, default_region, parameters, in_place=False, lookups=lookups).resolve(root)
+
+def conditions(root, default_region=None, parameters={}, lookups=None):
+    """
+    {condition name: bool} of an already parsed template, without resolving anything the conditions don't refer to.
+
+    >>> conditions({'Parameters': {'Stage': {'Type': 'String', 'Default': 'dev'}},
+    ...             'Conditions': {'IsProd': {'Fn::Equals': [{'Ref': 'Stage'}, 'prod']},
+    ...                            'IsDev': {'Fn::Not': [{'Condition': 'IsProd'}]}}},
+    ...            'us-east-1', {'Stage': 'prod'})
+    {'IsProd': True, 'IsDev': False}
+    """
+
+    return Parser(root, default_region, parameters, in_place=False, lookups=lookups).conditions.evaluate_all()
+
+def set_json_backend(loads=None):
+    """
+    Parses JSON with loads(str or bytes) from now on, e.g. orjson.loads or json.loads. None (the default) means
+    orjson if it's installed, with the json module as a fallback.
+
+    >>> set_json_backend(json.loads)
+    >>> loads_json(b'{"Outputs": {"Answer": {"Value": 42}}}')
+    {'Outputs': {'Answer': {'Value': 42}}}
+    >>> set_json_backend()
+    """
+
+    global _json_loads
+    _json_loads = loads
+
+def _load(root, default_region, parameters={}, lookups=None):
     """
     >>> import json
 
@@ -58,12 +150,68 @@ def _load(root, default_region, parameters={}):
             }
         }
     }
+
+    >>> _load({'Parameters': {'Stage': {'Type': 'String', 'Default': 'dev'}},
+    ...        'Conditions': {'IsProd': {'Fn::Equals': [{'Ref': 'Stage'}, 'prod']},
+    ...                       'IsProdEast': {'Fn::And': [{'Condition': 'IsProd'},
+    ...                                                  {'Fn::Equals': [{'Fn::Select': [5, []]}, 'never']}]}}},
+    ...       'us-east-1')['Conditions']
+    {'IsProd': False, 'IsProdEast': False}
+
+    >>> _load({'Resources': {'SomeBucket': {'Type': 'AWS::S3::Bucket'}}}, None)
+    {'Resources': {'SomeBucket': {'Type': 'AWS::S3::Bucket'}}}
+    >>> _load({'Outputs': {'Region': {'Value': {'Ref': 'AWS::Region'}}}}, '')
+    Traceback (most recent call last):
+        ...
+    TypeError: No default region in aws configuration, please specify one (with `aws configure` or `default_region=`)
     """
 
-    if not default_region:
-        raise TypeError("No default region in aws configuration, please specify one (with `aws configure` or `default_region=`)")
-    parser = Parser(root, default_region, parameters)
+    parser = Parser(root, default_region, parameters, lookups=lookups)
     parser.explode(root)
     parser.cleanup(root)
     return root
 
+# see set_json_backend, looked up on first use
+_json_loads = None
+
+def _cached(data, parse, default_region, parameters, lookups, cache):
+    if cache is None:
+        return _load(parse(data), default_region, parameters, lookups)
+    kind = 'JSON' if parse is _parse_json else 'YAML'
+    return cache.resolve(data, kind, default_region, parameters, lookups,
+                         lambda default_region, lookups: _load(parse(data), default_region, parameters, lookups))
+
+def _parse_yaml(stream_or_string):
+    # imported here, loading PyYAML is slow and not needed for JSON
+    import yaml
+    from aws_parsecf.yaml_loader import Loader
+    with profiling.timed('loading', 'parse YAML'):
+        return yaml.load(stream_or_string, Loader=Loader)
+
+def _parse_json(data):
+    global _json_loads
+    if _json_loads is None:
+        try:
+            import orjson
+        except ImportError:
+            _json_loads = json.loads
+        else:
+            _json_loads = _orjson_loads(orjson)
+    if isinstance(data, mmap.mmap) and _json_loads is json.loads:
+        # the json module only takes str / bytes
+        data = data[:]
+    with profiling.timed('loading', 'parse JSON'):
+        return _json_loads(data)
+
+def _orjson_loads(orjson):
+    def loads(data):
+        try:
+            if isinstance(data, mmap.mmap):
+                # released right away, or the mmap can't be closed
+                with memoryview(data) as view:
+                    return orjson.loads(view)
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # what the json module accepts but orjson doesn't (NaN, Infinity...), or the json module's error
+            return json.loads(data[:] if isinstance(data, mmap.mmap) else data)
+    return loads
@@ -0,0 +1,362 @@
+from aws_parsecf import profiling
+import json
+import os
+import tempfile
+import threading
+import time
+
+class Lookups:
+    """
+    Values of Fn::GetAZs and Fn::ImportValue, fetched from AWS once per region through availability_zones_cache
+    and exports_cache (by default the process-wide AVAILABILITY_ZONES and EXPORTS).
+
+    Can be seeded (e.g. with snapshot() of another instance) so nothing is fetched:
+
+    >>> lookups = Lookups(availability_zones={'us-east-1': ['us-east-1a', 'us-east-1b']},
+    ...                   exports={'us-east-1': {'SharedVpc': 'vpc-12345678'}})
+    >>> lookups.availability_zones('us-east-1')
+    ['us-east-1a', 'us-east-1b']
+    >>> lookups.exports('us-east-1')
+    {'SharedVpc': 'vpc-12345678'}
+    >>> Lookups(**lookups.snapshot()).exports('us-east-1')
+    {'SharedVpc': 'vpc-12345678'}
+
+    With clients (see Clients), caches of their own are used instead of the process-wide ones.
+    """
+
+    def __init__(self, availability_zones={}, exports={}, availability_zones_cache=None, exports_cache=None, clients=None):
+        # region -> [zone name]
+        self._availability_zones = dict(availability_zones)
+        # region -> {export name: value}
+        self._exports = dict(exports)
+        if availability_zones_cache is None:
+            availability_zones_cache = AVAILABILITY_ZONES if clients is None else AvailabilityZonesCache(clients=clients)
+        if exports_cache is None:
+            exports_cache = EXPORTS if clients is None else ExportsCache(clients=clients)
+        self.availability_zones_cache = availability_zones_cache
+        self.exports_cache = exports_cache
+
+    def availability_zones(self, region):
+        if region not in self._availability_zones:
+            self._availability_zones[region] = self.availability_zones_cache.get(region)
+        return self._availability_zones[region]
+
+    def exports(self, region):
+        if region not in self._exports:
+            self._exports[region] = self.exports_cache.get(region)
+        return self._exports[region]
+
+    def snapshot(self):
+        """
+        What was fetched so far, as keyword arguments for Lookups().
+        """
+
+        return {'availability_zones': dict(self._availability_zones), 'exports': dict(self._exports)}
+
+class RegionCache:
+    """
+    Values fetched per region, shared by Lookups (so Functions) instances, and optionally by processes through a
+    JSON file at path. Entries older than ttl seconds (None for never) are fetched again. When offline, nothing is
+    fetched and entries never expire, e.g. for a file seeded with {region: value}.
+
+    fetch(region) returns the value, see the subclasses for the defaults, which use boto3 clients from clients (by
+    default the process-wide CLIENTS). Values are shared, treat them as read-only.
+    """
+
+    def __init__(self, path=None, ttl=None, offline=False, fetch=None, clients=None):
+        self.path = path
+        self.ttl = ttl
+        self.offline = offline
+        self.fetch = fetch if fetch is not None else self._fetch
+        self.clients = clients if clients is not None else CLIENTS
+        # region -> (fetched at or None if seeded, value)
+        self._entries = {}
+        # held while changing _entries / the file, see _region_lock() for fetching
+        self._lock = threading.Lock()
+        # region -> lock held while getting it
+        self._region_locks = {}
+
+    def get(self, region):
+        with self._region_lock(region):
+            entry = self._entries.get(region)
+            if not self._fresh(entry) and self.path:
+                # possibly fetched by another process
+                entry = self._read().get(region, entry)
+            if not self._fresh(entry):
+                if self.offline:
+                    raise LookupError("No {} of {} cached (offline)".format(self.NAME, region))
+                return self._refresh(region)
+            with self._lock:
+                self._entries[region] = entry
+            return entry[1]
+
+    def refresh(self, region):
+        """
+        Fetches region again, regardless of the ttl.
+        """
+
+        with self._region_lock(region):
+            return self._refresh(region)
+
+    def prefetch(self, regions):
+        """
+        Makes sure regions are cached, e.g. before a bulk run.
+        """
+
+        for region in regions:
+            self.get(region)
+
+    def seed(self, values):
+        """
+        Injects {region: value} (e.g. a snapshot() from elsewhere), which never expires.
+        """
+
+        with self._lock:
+            entries = dict((region, (None, value)) for region, value in values.items())
+            self._entries.update(entries)
+            if self.path:
+                self._update(entries)
+
+    def snapshot(self):
+        """
+        {region: value} of what's cached in this process.
+        """
+
+        with self._lock:
+            return dict((region, value) for region, (_, value) in self._entries.items())
+
+    def invalidate(self, region=None):
+        """
+        Forgets region (or all regions), in memory and on disk.
+        """
+
+        with self._lock:
+            if region is None:
+                self._entries.clear()
+                if self.path:
+                    self._write({})
+            else:
+                self._entries.pop(region, None)
+                if self.path:
+                    content = self._read()
+                    content.pop(region, None)
+                    self._write(content)
+
+    def _region_lock(self, region):
+        # per region, so different regions are fetched concurrently
+        with self._lock:
+            lock = self._region_locks.get(region)
+            if lock is None:
+                lock = self._region_locks[region] = threading.Lock()
+            return lock
+
+    def _refresh(self, region):
+        with profiling.timed('aws', (self.NAME, region)):
+            entry = (time.time(), self.fetch(region))
+        with self._lock:
+            self._entries[region] = entry
+            if self.path:
+                self._update({region: entry})
+        return entry[1]
+
+    def _fresh(self, entry):
+        if entry is None:
+            return False
+        fetched_at, _ = entry
+        return self.offline or fetched_at is None or self.ttl is None or time.time() - fetched_at < self.ttl
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as f:
+                content = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+        if set(content) == {'fetched_at', 'values'}:
+            # written by _write
+            return dict((region, (content['fetched_at'].get(region), value))
+                        for region, value in content['values'].items())
+        # seeded by hand
+        return self._parse(content)
+
+    def _parse(self, content):
+        return dict((region, (None, value)) for region, value in content.items())
+
+    def _update(self, entries):
+        # merged with what other processes wrote
+        content = self._read()
+        content.update(entries)
+        self._write(content)
+
+    def _write(self, content):
+        # replaced atomically, other processes may be reading it
+        directory = os.path.dirname(os.path.abspath(self.path))
+        descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.aws-parsecf-')
+        with os.fdopen(descriptor, 'w') as f:
+            json.dump({'fetched_at': dict((region, fetched_at) for region, (fetched_at, _) in content.items()),
+                       'values': dict((region, value) for region, (_, value) in content.items())},
+                      f, sort_keys=True)
+        os.replace(temporary, self.path)
+
+class AvailabilityZonesCache(RegionCache):
+    """
+    Fn::GetAZs values, [zone name] per region, from EC2's DescribeAvailabilityZones (for a day by default).
+
+    >>> import json, os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'azs.json')
+    >>> with open(path, 'w') as f:
+    ...     json.dump({'us-east-1': ['us-east-1a', 'us-east-1b']}, f)
+    >>> offline = AvailabilityZonesCache(path, offline=True)
+    >>> offline.get('us-east-1')
+    ['us-east-1a', 'us-east-1b']
+    >>> offline.get('eu-west-1')
+    Traceback (most recent call last):
+        ...
+    LookupError: No availability zones of eu-west-1 cached (offline)
+
+    >>> fetched = []
+    >>> def fetch(region):
+    ...     fetched.append(region)
+    ...     return [region + 'a', region + 'b']
+    >>> cache = AvailabilityZonesCache(path, fetch=fetch)
+    >>> cache.get('eu-west-1')
+    ['eu-west-1a', 'eu-west-1b']
+    >>> cache.get('eu-west-1')
+    ['eu-west-1a', 'eu-west-1b']
+    >>> AvailabilityZonesCache(path, fetch=fetch).get('eu-west-1') # another process
+    ['eu-west-1a', 'eu-west-1b']
+    >>> fetched
+    ['eu-west-1']
+    >>> cache.invalidate('eu-west-1')
+    >>> AvailabilityZonesCache(path, fetch=fetch).get('eu-west-1')
+    ['eu-west-1a', 'eu-west-1b']
+    >>> fetched
+    ['eu-west-1', 'eu-west-1']
+    """
+
+    NAME = 'availability zones'
+
+    def __init__(self, path=None, ttl=24 * 60 * 60, offline=False, fetch=None, clients=None):
+        RegionCache.__init__(self, path, ttl, offline, fetch, clients)
+
+    def _fetch(self, region):
+        # NOTE: If you change this, please run the tests with FULL=true environment variable!
+        return [
+                zone['ZoneName'] for zone in
+                self.clients.get('ec2', region).describe_availability_zones()['AvailabilityZones']
+                ]
+
+class ExportsCache(RegionCache):
+    """
+    Fn::ImportValue values, {export name: value} per region, from all pages of CloudFormation's ListExports (for 5
+    minutes by default).
+
+    Offline, a file may also hold the output of `aws cloudformation list-exports`, for any region:
+
+    >>> import json, os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'exports.json')
+    >>> with open(path, 'w') as f:
+    ...     json.dump({'Exports': [{'Name': 'SharedVpc', 'Value': 'vpc-12345678', 'ExportingStackId': 'arn:...'}]}, f)
+    >>> ExportsCache(path, offline=True).get('us-east-1')
+    {'SharedVpc': 'vpc-12345678'}
+
+    >>> pages = {None: {'Exports': [{'Name': 'First', 'Value': '1'}], 'NextToken': 'page2'},
+    ...          'page2': {'Exports': [{'Name': 'Second', 'Value': '2'}]}}
+    >>> class StubClient:
+    ...     def list_exports(self, **kwargs):
+    ...         return pages[kwargs.get('NextToken')]
+    >>> cache = ExportsCache(fetch=lambda region: ExportsCache._list_exports(StubClient()))
+    >>> sorted(cache.get('us-east-1').items())
+    [('First', '1'), ('Second', '2')]
+    >>> cache.seed({'eu-west-1': {'Injected': 'value'}})
+    >>> cache.get('eu-west-1')
+    {'Injected': 'value'}
+    """
+
+    NAME = 'exports'
+
+    def __init__(self, path=None, ttl=5 * 60, offline=False, fetch=None, clients=None):
+        RegionCache.__init__(self, path, ttl, offline, fetch, clients)
+
+    def _fetch(self, region):
+        return ExportsCache._list_exports(self.clients.get('cloudformation', region))
+
+    @staticmethod
+    def _list_exports(client):
+        exports = {}
+        arguments = {}
+        while True:
+            response = client.list_exports(**arguments)
+            for export in response['Exports']:
+                exports[export['Name']] = export['Value']
+            if not response.get('NextToken'):
+                return exports
+            arguments['NextToken'] = response['NextToken']
+
+    def _parse(self, content):
+        if 'Exports' in content:
+            # `aws cloudformation list-exports` output, for any region
+            return _AnyRegion((None, dict((export['Name'], export['Value']) for export in content['Exports'])))
+        return RegionCache._parse(self, content)
+
+class Clients:
+    """
+    boto3 clients by (service, region), created once from session (by default a boto3 Session created on first
+    use) and shared by threads (boto3 clients are thread-safe, sessions aren't, so creating them is locked).
+    endpoint_url points every client somewhere else than AWS, e.g. a local stand-in.
+
+    >>> class StubSession:
+    ...     def client(self, service_name, region_name=None, endpoint_url=None):
+    ...         print("creating", service_name, region_name, endpoint_url)
+    ...         return object()
+    >>> clients = Clients(StubSession(), endpoint_url='http://localhost:5000')
+    >>> clients.get('ec2', 'us-east-1') is clients.get('ec2', 'us-east-1')
+    creating ec2 us-east-1 http://localhost:5000
+    True
+    >>> clients.get('ec2', 'eu-west-1') is clients.get('ec2', 'us-east-1')
+    creating ec2 eu-west-1 http://localhost:5000
+    False
+    """
+
+    def __init__(self, session=None, endpoint_url=None):
+        self.session = session
+        self.endpoint_url = endpoint_url
+        # (service, region) -> client
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, service, region):
+        client = self._clients.get((service, region))
+        if client is None:
+            with self._lock:
+                client = self._clients.get((service, region))
+                if client is None:
+                    if self.session is None:
+                        # boto3 takes a while to import, only pay for it when needed
+                        import boto3
+                        self.session = boto3.Session()
+                    client = self.session.client(service, region_name=region, endpoint_url=self.endpoint_url)
+                    self._clients[(service, region)] = client
+        return client
+
+    def clear(self):
+        """
+        Forgets the clients, e.g. after the credentials changed.
+        """
+
+        with self._lock:
+            self._clients.clear()
+
+class _AnyRegion(dict):
+    def __init__(self, entry):
+        dict.__init__(self)
+        self.entry = entry
+
+    def get(self, region, default=None):
+        return self.entry
+
+# shared by the default caches, AWS_PARSECF_ENDPOINT_URL points them somewhere else than AWS (e.g. a local stand-in)
+CLIENTS = Clients(endpoint_url=os.environ.get('AWS_PARSECF_ENDPOINT_URL'))
+# shared by default, AWS_PARSECF_AZS_CACHE / AWS_PARSECF_EXPORTS_CACHE are paths of JSON files to share them between
+# processes as well
+AVAILABILITY_ZONES = AvailabilityZonesCache(os.environ.get('AWS_PARSECF_AZS_CACHE'))
+EXPORTS = ExportsCache(os.environ.get('AWS_PARSECF_EXPORTS_CACHE'))
@@ -0,0 +1,216 @@
+from aws_parsecf.common import DELETE, CycleError
+from aws_parsecf.dependencies import Graph
+from aws_parsecf.parser import Parser
+import itertools
+import json
+
+def truth_tables(template, regions, parameter_values={}, lookups=None):
+    """
+    Evaluates the conditions, and which resources exist, for every combination of regions and parameter values
+    at once (see TruthTables). Each parameter the conditions depend on takes the values in parameter_values, its
+    AllowedValues, or its Default.
+
+    >>> tables = truth_tables({
+    ...     'Parameters': {'Stage': {'Type': 'String', 'AllowedValues': ['dev', 'prod']},
+    ...                    'Unused': {'Type': 'String', 'AllowedValues': ['a', 'b', 'c']}},
+    ...     'Conditions': {'IsProd': {'Fn::Equals': [{'Ref': 'Stage'}, 'prod']},
+    ...                    'IsEast': {'Fn::Equals': [{'Fn::Select': [0, {'Fn::Split': ['-', {'Ref': 'AWS::Region'}]}]}, 'us']},
+    ...                    'IsProdEast': {'Fn::And': [{'Condition': 'IsProd'}, {'Condition': 'IsEast'}]}},
+    ...     'Resources': {'Alarm': {'Type': 'AWS::CloudWatch::Alarm', 'Condition': 'IsProdEast'},
+    ...                   'Topic': {'Type': 'AWS::SNS::Topic'}}},
+    ...     ['us-east-1', 'eu-west-1'])
+    >>> tables.assignments
+    [('us-east-1', {'Stage': 'dev'}), ('us-east-1', {'Stage': 'prod'}), ('eu-west-1', {'Stage': 'dev'}), ('eu-west-1', {'Stage': 'prod'})]
+    >>> tables.select(tables.resources['Alarm'])
+    [('us-east-1', {'Stage': 'prod'})]
+    >>> tables.resources['Topic'] == tables.all
+    True
+    >>> tables.includes('Alarm', 'eu-west-1', {'Stage': 'prod'})
+    False
+    """
+
+    return TruthTables(template, regions, parameter_values, lookups)
+
+class TruthTables:
+    """
+    Conditions evaluated over assignments, a list of (region, {parameter name: value}) with all the combinations,
+    as bit masks: bit i of a mask is set when it holds for assignments[i].
+
+    - conditions: {condition name: mask}
+    - resources: {resource name: mask of where it exists}
+    - all: the mask of all the assignments
+
+    Fn::And / Fn::Or / Fn::Not are bitwise operations, Fn::Equals partitions the assignments by the value of each
+    operand, resolving it once per combination of the inputs it depends on only.
+    """
+
+    def __init__(self, template, regions, parameter_values={}, lookups=None):
+        self.template = template
+        self._lookups = lookups
+        dependencies = Graph(template)
+
+        # inputs the conditions depend on, with their possible values
+        needed = set()
+        for name in template.get('Conditions', ()):
+            entry = ('Conditions', name)
+            needed.update(dependencies.requires(entry))
+            needed.add(entry)
+        if any(entry in dependencies.dynamic for entry in needed):
+            needed.update(('Parameters', name) for name in template.get('Parameters', ()))
+        names = sorted(name for section, name in needed if section == 'Parameters')
+        self._inputs = ['AWS::Region'] + names
+        choices = [list(regions)] + [self._values(name, parameter_values) for name in names]
+
+        self.assignments = []
+        for combination in itertools.product(*choices):
+            self.assignments.append((combination[0], dict(
+                (name, value) for name, value in zip(names, combination[1:]) if value is not _MISSING)))
+        self.all = (1 << len(self.assignments)) - 1
+
+        # input -> {value: mask}, assignments are numbered in mixed radix (the last input changes fastest) so each
+        # value's mask is a block of ones repeating with the period of the input
+        self._input_masks = dict((name, {}) for name in self._inputs)
+        stride = 1
+        for name, values in reversed(list(zip(self._inputs, choices))):
+            period = stride * len(values)
+            repeat = ((1 << len(self.assignments)) - 1) // ((1 << period) - 1) if period else 0
+            masks = self._input_masks[name]
+            for choice, value in enumerate(values):
+                value = _freeze(value)
+                masks[value] = masks.get(value, 0) | (((1 << stride) - 1) << (choice * stride)) * repeat
+            stride = period
+        self._choices = dict(zip(self._inputs, choices))
+        self._positions = dict(
+                (self._key(region, parameters), index) for index, (region, parameters) in enumerate(self.assignments))
+
+        self._dependencies = dependencies
+        self._evaluating = []
+        self.conditions = {}
+        for name in template.get('Conditions', ()):
+            self._condition(name)
+
+        self.resources = {}
+        for name, resource in template.get('Resources', {}).items():
+            condition_name = resource.get('Condition') if isinstance(resource, dict) else None
+            if condition_name and isinstance(condition_name, str):
+                self.resources[name] = self._condition(condition_name)
+            else:
+                self.resources[name] = self.all
+
+    def select(self, mask):
+        """
+        The assignments of mask's bits.
+        """
+
+        return [assignment for index, assignment in enumerate(self.assignments) if mask >> index & 1]
+
+    def includes(self, resource_name, region, parameters={}):
+        """
+        Whether the resource exists in region with parameters (values of the parameters the conditions depend on).
+        """
+
+        index = self._positions[self._key(region, parameters)]
+        return bool(self.resources[resource_name] >> index & 1)
+
+    def _key(self, region, parameters):
+        return (region,) + tuple(_freeze(parameters.get(name, _MISSING)) for name in self._inputs[1:])
+
+    def _values(self, name, parameter_values):
+        if name in parameter_values:
+            return list(parameter_values[name])
+        parameter = self.template['Parameters'][name]
+        if 'AllowedValues' in parameter:
+            return list(parameter['AllowedValues'])
+        # the default, or unknown
+        return [_MISSING]
+
+    def _condition(self, name):
+        mask = self.conditions.get(name)
+        if mask is None:
+            if name in self._evaluating:
+                cycle = self._evaluating[self._evaluating.index(name):] + [name]
+                raise CycleError([('Conditions', name) for name in cycle])
+            self._evaluating.append(name)
+            try:
+                mask = self._evaluate(self.template['Conditions'][name])
+            finally:
+                self._evaluating.pop()
+            self.conditions[name] = mask
+        return mask
+
+    def _evaluate(self, condition):
+        if isinstance(condition, str):
+            return self._condition(condition)
+        elif isinstance(condition, bool):
+            return self.all if condition else 0
+
+        # single-value dict with key as the type (see Conditions.MAP)
+        condition_type, value = next(iter(condition.items()))
+        if condition_type == 'Condition':
+            return self._condition(value)
+        elif condition_type == 'Fn::And':
+            mask = self.all
+            for operand in value:
+                mask &= self._evaluate(operand)
+            return mask
+        elif condition_type == 'Fn::Or':
+            mask = 0
+            for operand in value:
+                mask |= self._evaluate(operand)
+            return mask
+        elif condition_type == 'Fn::Not':
+            operand, = value
+            return self.all & ~self._evaluate(operand)
+        elif condition_type == 'Fn::Equals':
+            partitions = [self._partition(operand) for operand in value]
+            mask = self.all
+            for partition in partitions[1:]:
+                mask &= sum(
+                        masks & partition.get(frozen, 0)
+                        for frozen, masks in partitions[0].items() if frozen is not _DELETE)
+            return mask
+        raise ValueError("Unsupported condition: {}".format(condition_type))
+
+    def _partition(self, operand):
+        """
+        {frozen value: mask of the assignments where operand resolves to it}
+        """
+
+        if not isinstance(operand, (dict, list)):
+            return {_freeze(operand): self.all}
+        inputs = self._operand_inputs(operand)
+        partition = {}
+        for combination in itertools.product(*[self._choices[name] for name in inputs]):
+            mask = self.all
+            for name, value in zip(inputs, combination):
+                mask &= self._input_masks[name][_freeze(value)]
+            if not mask:
+                continue
+            values = dict(zip(inputs, combination))
+            region = values.pop('AWS::Region', self._choices['AWS::Region'][0])
+            parameters = dict((name, value) for name, value in values.items() if value is not _MISSING)
+            resolved = Parser(self.template, region, parameters, in_place=False, lookups=self._lookups).resolve(operand)
+            frozen = _DELETE if resolved is DELETE else _freeze(resolved)
+            partition[frozen] = partition.get(frozen, 0) | mask
+        return partition
+
+    def _operand_inputs(self, operand):
+        references, regional, dynamic = self._dependencies.scan(operand)
+        for reference in list(references):
+            if reference in self._dependencies.references:
+                references |= self._dependencies.requires(reference)
+        regional = regional or any(reference in self._dependencies.regional for reference in references)
+        if dynamic or any(reference in self._dependencies.dynamic for reference in references):
+            return self._inputs
+        names = sorted(name for section, name in references if section == 'Parameters' and name in self._choices)
+        return (['AWS::Region'] if regional else []) + names
+
+# a parameter without AllowedValues, resolved from its Default or unknown
+_MISSING = object()
+# an operand resolved to DELETE (AWS::NoValue), which equals nothing
+_DELETE = object()
+
+def _freeze(value):
+    if value is _MISSING:
+        return value
+    return json.dumps(value, sort_keys=True, default=repr)
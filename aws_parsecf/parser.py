@@ -1,72 +1,448 @@
 from aws_parsecf.common import DELETE
 from aws_parsecf.conditions import Conditions
 from aws_parsecf.functions import Functions
+from aws_parsecf import profiling
+
+# frame kinds of Parser.resolve
+_OBJECT, _ARRAY, _FUNCTION, _ARGUMENTS = range(4)
+# a child that was pushed on the stack and will be resolved later
+_PENDING = object()
 
 class Parser:
-    def __init__(self, root, default_region, parameters={}):
-        self.functions = Functions(self, root, default_region, parameters)
+    def __init__(self, root, default_region, parameters={}, in_place=True, resolved=None, lookups=None):
+        self.functions = Functions(self, root, default_region, parameters, lookups)
         self.conditions = Conditions(self, root, default_region)
+        self.in_place = in_place
+        # intrinsic function / condition type -> handler, anything else is plain data
+        self.intrinsics = dict(self.conditions.handlers)
+        del self.intrinsics['Condition'] # 'Condition' means a name of a condtion
+        self.intrinsics.update(self.functions.handlers)
+        # id(node) -> (node, resolved), used instead of '_exploded' when not in_place
+        self._resolved = resolved if resolved is not None else {}
+        profiling.instrument(self)
 
     def explode(self, current):
-        # object
+        """
+        Iterative, so deep templates don't hit the recursion limit.
+
+        >>> root = {'Fn::Join': ['', ['a', {'Ref': 'AWS::Region'}]]}
+        >>> for _ in range(5000):
+        ...     root = {'Fn::Join': ['', ['a', root]]}
+        >>> root = {'Value': root}
+        >>> parser = Parser(root, 'us-east-1')
+        >>> parser.explode(root)
+        >>> parser.cleanup(root)
+        >>> root['Value'] == 'a' * 5001 + 'us-east-1'
+        True
+
+        Like resolve(), AWS::NoValue is removed from lists and objects before intrinsic functions get them, but not
+        from their own (positional) arguments:
+
+        >>> import copy
+        >>> template = {'Conditions': {'Never': {'Fn::Equals': [1, 2]}},
+        ...             'Outputs': {'Second': {'Value': {'Fn::Select': [1, [{'Fn::If': ['Never', 'w', {'Ref': 'AWS::NoValue'}]},
+        ...                                                                 'x', 'y']]}}}}
+        >>> root = copy.deepcopy(template)
+        >>> parser = Parser(root, 'us-east-1')
+        >>> parser.explode(root)
+        >>> parser.cleanup(root)
+        >>> root['Outputs'], Parser(template, 'us-east-1', in_place=False).resolve(template)['Outputs']
+        ({'Second': {'Value': 'y'}}, {'Second': {'Value': 'y'}})
+        """
+
         if isinstance(current, dict):
             if '_exploded' in current:
                 return
-            current['_exploded'] = True
-
-            # explode children first
-            for key, value in current.items():
-                self.exploded(current, key)
-
-            condition_name = current.get('Condition')
-            if condition_name and isinstance(condition_name, str):
-                # condition
-                if not self.conditions.evaluate(condition_name):
-                    return DELETE
-            elif len(current) == 2: # including '_exploded'
-                # possibly a condition
-                key, value = next((key, value) for key, value in current.items() if key != '_exploded')
-                try:
-                    return self.functions.evaluate(key, value)
-                except KeyError as e:
-                    if e.args != (key,):
-                        raise
-                    # not an intrinsic function
-                if key != 'Condition': # 'Condition' means a name of a condtion, would make a mess
-                    try:
-                        return self.conditions.evaluate({key: value})
-                    except KeyError as e:
-                        if e.args != (key,):
-                            raise
-                        # not a condition
-        # array
-        elif isinstance(current, list):
-            for index, value in enumerate(current):
-                self.exploded(current, index)
+            if current is self.functions.root:
+                self._evaluate_conditions()
+            current['_exploded'] = False # True once done, see exploding()
+        elif not isinstance(current, list):
+            return
 
-    def cleanup(self, current):
+        # [node, keys, key being exploded, whether a value is DELETE], children are exploded before their parent
+        stack = [[current, Parser._keys(current), None, False]]
+        while stack:
+            frame = stack[-1]
+            node = frame[0]
+            for key in frame[1]:
+                value = node[key]
+                if isinstance(value, dict):
+                    if '_exploded' in value:
+                        continue
+                    value['_exploded'] = False
+                elif not isinstance(value, list):
+                    if value is DELETE:
+                        frame[3] = True
+                    continue
+                frame[2] = key
+                stack.append([value, Parser._keys(value), None, False])
+                break
+            else:
+                stack.pop()
+                if frame[3] and not (stack and isinstance(node, list) and self._arguments(stack[-1])):
+                    # like resolve(), what's deleted is gone before an intrinsic function gets it, but its own
+                    # arguments are positional
+                    Parser._compact(node)
+                if isinstance(node, dict):
+                    node['_exploded'] = True
+                    exploded = self._explode_object(node)
+                else:
+                    exploded = None
+                if not stack:
+                    return exploded
+                if exploded is not None:
+                    parent = stack[-1]
+                    parent[0][parent[2]] = exploded
+                    if exploded is DELETE:
+                        parent[3] = True
+
+    def _explode_object(self, current):
+        condition_name = current.get('Condition')
+        if condition_name and isinstance(condition_name, str):
+            # condition
+            if not self.conditions.evaluate(condition_name):
+                return DELETE
+        elif len(current) == 2: # including '_exploded'
+            # possibly an intrinsic function or a condition
+            key, value = next((key, value) for key, value in current.items() if key != '_exploded')
+            handler = self.intrinsics.get(key)
+            if handler is not None:
+                return handler(value)
+
+    def _arguments(self, frame):
+        # whether frame is of an intrinsic function, so the value it's exploding is the arguments
+        node = frame[0]
+        return isinstance(node, dict) and len(node) == 2 and frame[2] in self.intrinsics
+
+    @staticmethod
+    def _compact(current):
         if isinstance(current, dict):
-            if '_exploded' in current:
-                del current['_exploded']
-            for key, value in list(current.items()):
-                if value is DELETE:
+            for key in [key for key, value in current.items() if value is DELETE]:
+                del current[key]
+        else:
+            current[:] = [value for value in current if value is not DELETE]
+
+    @staticmethod
+    def _keys(current):
+        if isinstance(current, dict):
+            return iter(current)
+        return iter(range(len(current)))
+
+    def cleanup(self, current):
+        """
+        Removes what explode() deleted (e.g. AWS::NoValue) and its markers, compacting each list in one pass. Each
+        dict and list is cleaned up once, even when explode() linked it in several places or into itself.
+
+        >>> root = {'Conditions': {'Never': {'Fn::Equals': [1, 2]}},
+        ...         'Resources': {'SomeResource': {'List': [{'Fn::If': ['Never', index, {'Ref': 'AWS::NoValue'}]}
+        ...                                                 if index % 2 else index for index in range(10)]}}}
+        >>> parser = Parser(root, 'us-east-1')
+        >>> parser.explode(root)
+        >>> parser.cleanup(root)
+        >>> root['Resources']
+        {'SomeResource': {'List': [0, 2, 4, 6, 8]}}
+
+        >>> root = {'Resources': {'A': {'Type': 'AWS::S3::Bucket', 'Properties': {'X': {'Fn::GetAtt': ['A', 'Properties']}}}}}
+        >>> parser = Parser(root, 'us-east-1')
+        >>> parser.explode(root)
+        >>> parser.cleanup(root)
+        >>> properties = root['Resources']['A']['Properties']
+        >>> properties['X'] is properties
+        True
+        """
+
+        # ids of the dicts and lists already cleaned up
+        seen = set()
+        stack = [current]
+        while stack:
+            current = stack.pop()
+            if id(current) in seen:
+                continue
+            seen.add(id(current))
+            if isinstance(current, dict):
+                if '_exploded' in current:
+                    del current['_exploded']
+                deleted = []
+                for key, value in current.items():
+                    if value is DELETE:
+                        deleted.append(key)
+                    elif isinstance(value, (dict, list)):
+                        stack.append(value)
+                for key in deleted:
                     del current[key]
+            elif isinstance(current, list):
+                # kept values move down over the deleted ones, then the tail goes at once
+                kept = 0
+                for value in current:
+                    if value is not DELETE:
+                        current[kept] = value
+                        kept += 1
+                        if isinstance(value, (dict, list)):
+                            stack.append(value)
+                del current[kept:]
+
+    def resolve(self, current, depth=0):
+        """
+        Single pass alternative to explode + cleanup, builds a resolved copy and leaves current untouched.
+
+        Recursive (which is faster) up to MAX_RECURSION levels, deeper subtrees continue on an explicit stack.
+
+        >>> root = {'Conditions': {'ConditionName': {'Fn::Equals': [1, 2]}},
+        ...         'Resources': {'SomeResource': {'Condition': 'ConditionName'},
+        ...                       'OtherResource': {'List': [{'Fn::If': ['ConditionName', 1, {'Ref': 'AWS::NoValue'}]}, 2]}}}
+        >>> resolved = Parser(root, 'us-east-1', in_place=False).resolve(root)
+        >>> resolved == {'Conditions': {'ConditionName': False},
+        ...              'Resources': {'OtherResource': {'List': [2]}}}
+        True
+        >>> root['Resources']['OtherResource']
+        {'List': [{'Fn::If': ['ConditionName', 1, {'Ref': 'AWS::NoValue'}]}, 2]}
+
+        >>> root = {'Fn::Join': ['', ['a', {'Ref': 'AWS::Region'}]]}
+        >>> for _ in range(5000):
+        ...     root = {'Fn::Join': ['', ['a', root]]}
+        >>> Parser(root, 'us-east-1', in_place=False).resolve(root) == 'a' * 5001 + 'us-east-1'
+        True
+        """
+
+        # object
+        if isinstance(current, dict):
+            memoized = self._resolved.get(id(current))
+            if memoized is not None:
+                return memoized[1]
+            if depth == 0 and current is self.functions.root:
+                self._evaluate_conditions()
+            if depth > Parser.MAX_RECURSION:
+                return self._resolve_deep(current)
+            # re-entrant lookups (e.g. a resource referencing itself) see the raw node, like '_exploded'
+            self._resolved[id(current)] = (current, current)
+
+            if len(current) == 1:
+                key, value = next(iter(current.items()))
+                handler = self.intrinsics.get(key)
+                if handler is not None:
+                    resolved = handler(self._resolve_arguments(value, depth + 1))
                 else:
-                    self.cleanup(value)
+                    resolved = self._resolve_object(current, depth + 1)
+            else:
+                resolved = self._resolve_object(current, depth + 1)
+
+            self._resolved[id(current)] = (current, resolved)
+            return resolved
+        # array
         elif isinstance(current, list):
-            deleted = 0
-            for index, value in enumerate(list(current)):
+            memoized = self._resolved.get(id(current))
+            if memoized is not None:
+                # only lists given to the constructor, e.g. constants
+                return memoized[1]
+            if depth > Parser.MAX_RECURSION:
+                return self._resolve_deep(current)
+            resolved = []
+            for value in current:
+                if isinstance(value, (dict, list)):
+                    value = self.resolve(value, depth + 1)
+                    if value is DELETE:
+                        continue
+                resolved.append(value)
+            return resolved
+        return current
+
+    MAX_RECURSION = 200
+
+    def _resolve_object(self, current, depth):
+        resolved = {}
+        for key, value in current.items():
+            if isinstance(value, (dict, list)):
+                value = self.resolve(value, depth)
                 if value is DELETE:
-                    del current[index - deleted]
-                    deleted += 1
+                    continue
+            resolved[key] = value
+
+        condition_name = resolved.get('Condition')
+        if condition_name and isinstance(condition_name, str):
+            # condition
+            if not self.conditions.evaluate(condition_name):
+                return DELETE
+        return resolved
+
+    def _resolve_arguments(self, value, depth):
+        # intrinsic function arguments are positional, so DELETE (e.g. a NoValue branch of Fn::If) is kept
+        if isinstance(value, list):
+            return [self.resolve(argument, depth) for argument in value]
+        return self.resolve(value, depth)
+
+    def _resolve_deep(self, current):
+        # [kind, node, children, result, key being resolved]
+        stack = []
+        resolved = self._enter(current, stack)
+        memo = self._resolved
+        while stack:
+            frame = stack[-1]
+            kind, result = frame[0], frame[3]
+            for key, value in frame[2]:
+                if isinstance(value, dict):
+                    memoized = memo.get(id(value))
+                    if memoized is None:
+                        frame[4] = key
+                        self._enter(value, stack)
+                        break
+                    value = memoized[1]
+                elif isinstance(value, list):
+                    memoized = memo.get(id(value))
+                    if memoized is None:
+                        frame[4] = key
+                        # intrinsic function arguments are positional, so DELETE (e.g. a NoValue branch of Fn::If) is kept
+                        stack.append([_ARGUMENTS if kind is _FUNCTION else _ARRAY, value, enumerate(value), [], None])
+                        break
+                    value = memoized[1]
+
+                if kind is _OBJECT:
+                    if value is not DELETE:
+                        result[key] = value
+                elif kind is _ARRAY:
+                    if value is not DELETE:
+                        result.append(value)
+                elif kind is _FUNCTION:
+                    frame[3] = value
                 else:
-                    self.cleanup(value)
+                    result.append(value)
+            else:
+                stack.pop()
+                if kind is _OBJECT:
+                    resolved = result
+                    condition_name = result.get('Condition')
+                    if condition_name and isinstance(condition_name, str):
+                        # condition
+                        if not self.conditions.evaluate(condition_name):
+                            resolved = DELETE
+                    memo[id(frame[1])] = (frame[1], resolved)
+                elif kind is _FUNCTION:
+                    resolved = self.intrinsics[next(iter(frame[1]))](frame[3])
+                    memo[id(frame[1])] = (frame[1], resolved)
+                else:
+                    resolved = result
+
+                # hand over to the parent
+                if stack:
+                    parent = stack[-1]
+                    if parent[0] is _OBJECT:
+                        if resolved is not DELETE:
+                            parent[3][parent[4]] = resolved
+                    elif parent[0] is _ARRAY:
+                        if resolved is not DELETE:
+                            parent[3].append(resolved)
+                    elif parent[0] is _FUNCTION:
+                        parent[3] = resolved
+                    else:
+                        parent[3].append(resolved)
+        return resolved
+
+    def _enter(self, current, stack):
+        # object
+        if isinstance(current, dict):
+            memoized = self._resolved.get(id(current))
+            if memoized is not None:
+                return memoized[1]
+            # re-entrant lookups (e.g. a resource referencing itself) see the raw node, like '_exploded'
+            self._resolved[id(current)] = (current, current)
+
+            if len(current) == 1:
+                if next(iter(current)) in self.intrinsics:
+                    stack.append([_FUNCTION, current, iter(current.items()), None, None])
+                    return _PENDING
+            stack.append([_OBJECT, current, iter(current.items()), {}, None])
+            return _PENDING
+        # array
+        elif isinstance(current, list):
+            memoized = self._resolved.get(id(current))
+            if memoized is not None:
+                return memoized[1]
+            stack.append([_ARRAY, current, enumerate(current), [], None])
+            return _PENDING
+        return current
+
+    def exploding(self, collection, key):
+        """
+        Whether collection[key] is still being exploded (i.e. this is a re-entrant lookup), so values
+        derived from it shouldn't be cached.
+
+        >>> root = {'Resources': {'SomeResource': {'Properties': {'Name': {'Fn::GetAtt': ['SomeResource', 'Other']}}}}}
+        >>> parser = Parser(root, 'us-east-1')
+        >>> parser.exploding(root['Resources'], 'SomeResource')
+        False
+        >>> parser.explode(root)
+        >>> parser.exploding(root['Resources'], 'SomeResource')
+        False
+        """
+
+        current = collection[key]
+        if not isinstance(current, dict):
+            return False
+        if self.in_place:
+            return current.get('_exploded') is False
+        memoized = self._resolved.get(id(current))
+        return memoized is not None and memoized[1] is current
+
+    def forget(self, node):
+        """
+        Drops what resolve() memoized for node and everything under it, e.g. after editing it.
+        """
+
+        memo = self._resolved
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if isinstance(current, dict):
+                stack.extend(current.values())
+            elif isinstance(current, list):
+                stack.extend(current)
+            else:
+                continue
+            memoized = memo.pop(id(current), None)
+            if memoized is not None and isinstance(memoized[1], dict):
+                # registered by exploded()
+                registered = memo.get(id(memoized[1]))
+                if registered is not None and registered[0] is memoized[1]:
+                    del memo[id(memoized[1])]
+
+    def _evaluate_conditions(self):
+        # named conditions go through Conditions.evaluate, which evaluates each once with Fn::And / Fn::Or
+        # short-circuiting, before the Conditions section is reached like any other data
+        if isinstance(self.functions.root.get('Conditions'), dict):
+            self.conditions.evaluate_all()
+
+    def memoized(self, node):
+        """
+        What node was already resolved to when not in_place (e.g. given to the constructor), or None.
+        """
+
+        if self.in_place or not isinstance(node, (dict, list)):
+            return None
+        memoized = self._resolved.get(id(node))
+        if memoized is None or memoized[1] is node:
+            # unknown, or being resolved
+            return None
+        return memoized[1]
+
+    def evaluated(self, collection, key, value):
+        """
+        Records value as the result of collection[key], evaluated elsewhere (e.g. a named condition).
+        """
+
+        if self.in_place:
+            collection[key] = value
+        elif isinstance(collection[key], (dict, list)):
+            self._resolved[id(collection[key])] = (collection[key], value)
 
     def exploded(self, collection, key):
+        if not self.in_place:
+            resolved = self.resolve(collection[key])
+            if isinstance(resolved, dict):
+                # lookups may continue from the resolved value (e.g. Fn::FindInMap)
+                self._resolved[id(resolved)] = (resolved, resolved)
+            return resolved
         if collection[key] is None:
             return None
         exploded = self.explode(collection[key])
         if exploded is not None:
             collection[key] = exploded
         return collection[key]
-
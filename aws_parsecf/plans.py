@@ -0,0 +1,226 @@
+from aws_parsecf.conditions import Conditions
+from aws_parsecf.dependencies import Graph
+from aws_parsecf.functions import Functions
+from aws_parsecf.parser import Parser
+import collections
+import json
+
+# intrinsic function / condition types, see Parser.intrinsics
+INTRINSICS = (set(Functions.MAP) | set(Conditions.MAP)) - {'Condition'}
+# intrinsic functions whose values come from Lookups, which may change between resolutions of the same inputs
+LOOKUPS = ('Fn::GetAZs', 'Fn::ImportValue')
+
+def compile(template, size=128):
+    """
+    Analyzes a parsed template once, for resolving it many times (see Plan.resolve). Each entry keeps its results
+    for the size most recently used values of its inputs.
+
+    >>> plan = compile({
+    ...     'Parameters': {'Stage': {'Type': 'String', 'Default': 'dev'}},
+    ...     'Resources': {
+    ...         'Static': {'Type': 'AWS::SNS::Topic', 'Properties': {'TopicName': 'static'}},
+    ...         'Staged': {'Type': 'AWS::SNS::Topic', 'Properties': {'TopicName': {'Fn::Sub': 'topic-${Stage}'}}},
+    ...         'Regional': {'Type': 'AWS::SNS::Topic', 'Properties': {'TopicName':
+    ...             {'Fn::Join': ['-', [{'Ref': 'Staged'}, {'Ref': 'AWS::Region'}]]}}}}})
+    >>> east = plan.resolve('us-east-1')
+    >>> east['Resources']['Regional']['Properties']['TopicName']
+    'topic-dev-us-east-1'
+    >>> west = plan.resolve('us-west-2', {'Stage': 'prod'})
+    >>> west['Resources']['Regional']['Properties']['TopicName']
+    'topic-prod-us-west-2'
+    >>> east['Resources']['Static'] is west['Resources']['Static']
+    True
+    >>> plan.resolve('us-west-2')['Resources']['Staged'] is east['Resources']['Staged']
+    True
+
+    Entries using Fn::GetAZs / Fn::ImportValue are resolved every time, with the lookups given then:
+
+    >>> from aws_parsecf.lookups import Lookups
+    >>> plan = compile({'Outputs': {'Shared': {'Value': {'Fn::ImportValue': 'Shared'}},
+    ...                             'Zones': {'Value': {'Fn::GetAZs': ''}}}})
+    >>> plan.resolve('us-east-1', lookups=Lookups(availability_zones={'us-east-1': ['a']},
+    ...                                           exports={'us-east-1': {'Shared': 'one'}}))
+    {'Outputs': {'Shared': {'Value': 'one'}, 'Zones': {'Value': ['a']}}}
+    >>> plan.resolve('us-east-1', lookups=Lookups(availability_zones={'us-east-1': ['b']},
+    ...                                           exports={'us-east-1': {'Shared': 'two'}}))
+    {'Outputs': {'Shared': {'Value': 'two'}, 'Zones': {'Value': ['b']}}}
+
+    Results of inputs not used lately are resolved again:
+
+    >>> plan = compile({'Outputs': {'Region': {'Value': {'Fn::Join': ['', [{'Ref': 'AWS::Region'}]]}}}}, size=1)
+    >>> east = plan.resolve('us-east-1')
+    >>> plan.resolve('us-east-1')['Outputs']['Region'] is east['Outputs']['Region']
+    True
+    >>> west = plan.resolve('us-west-2')
+    >>> plan.resolve('us-east-1')['Outputs']['Region'] is east['Outputs']['Region']
+    False
+    """
+
+    return Plan(template, size)
+
+class Plan:
+    """
+    A template analyzed for repeated resolution:
+
+    - intrinsic-free subtrees are constants, shared as is by all resolutions
+    - each top-level entry (a resource, an output, a condition...) records the inputs ('AWS::Region' and
+      parameter names) it transitively depends on, and is resolved once per distinct value of those inputs (the
+      size most recently used ones are kept), unless it uses lookups (Fn::GetAZs, Fn::ImportValue), or may depend
+      on anything in a template that uses them
+
+    Resolved templates share structure with each other and with the template, treat them as read-only.
+    """
+
+    def __init__(self, template, size=128):
+        self.template = template
+        self.size = size
+        # id(node) -> (node, node) for the outermost constant subtrees
+        self._constants = {}
+        self._find_constants()
+        # (section, name) -> frozenset of inputs, None if it may depend on anything
+        self._inputs = {}
+        self._find_inputs()
+        # inputs -> ([node], {inputs' values: {index of node: resolved}}) of the entries depending on them, least
+        # recently used values first
+        self._entries = {}
+        for (section, name), inputs in self._inputs.items():
+            node = self.template[section][name]
+            if not isinstance(node, (dict, list)):
+                continue
+            if LOOKUPS in inputs if inputs is not None else self._lookups:
+                # never cached
+                continue
+            inputs = tuple(sorted(inputs)) if inputs is not None else None
+            self._entries.setdefault(inputs, ([], collections.OrderedDict()))[0].append(node)
+
+    def resolve(self, default_region=None, parameters={}, lookups=None):
+        """
+        Same as aws_parsecf.resolve(template, default_region, parameters, lookups).
+        """
+
+        resolved = dict(self._constants)
+        keys = []
+        for inputs, (nodes, cache) in self._entries.items():
+            key = Plan._key(inputs, default_region, parameters)
+            keys.append((key, nodes, cache))
+            values = cache.get(key)
+            if values is not None:
+                cache.move_to_end(key)
+                for index, value in values.items():
+                    resolved[id(nodes[index])] = (nodes[index], value)
+
+        parser = Parser(self.template, default_region, parameters, in_place=False, resolved=resolved, lookups=lookups)
+        result = parser.resolve(self.template)
+
+        for key, nodes, cache in keys:
+            values = {}
+            for index, node in enumerate(nodes):
+                memoized = resolved.get(id(node))
+                if memoized is not None:
+                    values[index] = memoized[1]
+            cache[key] = values
+            cache.move_to_end(key)
+            while len(cache) > self.size:
+                cache.popitem(last=False)
+        return result
+
+    def _find_constants(self):
+        # post order, a container is constant if it's neither an intrinsic function nor conditional, and all of its
+        # children are constant
+        constant = {}
+        stack = [(self.template, False)]
+        while stack:
+            current, children_done = stack.pop()
+            if isinstance(current, dict):
+                if children_done:
+                    constant[id(current)] = (
+                            not (len(current) == 1 and next(iter(current)) in INTRINSICS) and
+                            not isinstance(current.get('Condition'), str) and
+                            all(constant.get(id(value), True) for value in current.values()))
+                else:
+                    stack.append((current, True))
+                    stack.extend((value, False) for value in current.values() if isinstance(value, (dict, list)))
+            elif isinstance(current, list):
+                if children_done:
+                    constant[id(current)] = all(constant.get(id(value), True) for value in current)
+                else:
+                    stack.append((current, True))
+                    stack.extend((value, False) for value in current if isinstance(value, (dict, list)))
+
+        # only the outermost ones are needed
+        stack = [self.template]
+        while stack:
+            current = stack.pop()
+            if constant[id(current)]:
+                self._constants[id(current)] = (current, current)
+            elif isinstance(current, dict):
+                stack.extend(value for value in current.values() if isinstance(value, (dict, list)))
+            else:
+                stack.extend(value for value in current if isinstance(value, (dict, list)))
+
+    def _find_inputs(self):
+        dependencies = Graph(self.template)
+        references = {}
+        # whether any entry uses lookups
+        self._lookups = False
+        for entry, entries in dependencies.references.items():
+            lookups = Plan._uses_lookups(self.template[entry[0]][entry[1]])
+            self._lookups = self._lookups or lookups
+            if entry in dependencies.dynamic:
+                inputs = None
+            else:
+                inputs = {'AWS::Region'} if entry in dependencies.regional else set()
+                if entry[0] == 'Parameters':
+                    inputs.add(entry[1])
+                if lookups:
+                    inputs.add(LOOKUPS)
+            references[entry] = (inputs, entries)
+
+        # transitive closure
+        self._inputs = dict((entry, inputs) for entry, (inputs, _) in references.items())
+        changed = True
+        while changed:
+            changed = False
+            for entry, (_, entries) in references.items():
+                inputs = self._inputs[entry]
+                if inputs is None:
+                    continue
+                for referenced in entries:
+                    if referenced not in self._inputs:
+                        continue
+                    referenced_inputs = self._inputs[referenced]
+                    if referenced_inputs is None:
+                        inputs = None
+                        break
+                    inputs = inputs | referenced_inputs
+                if inputs != self._inputs[entry]:
+                    self._inputs[entry] = inputs
+                    changed = True
+        for entry, inputs in self._inputs.items():
+            if inputs is not None:
+                self._inputs[entry] = frozenset(inputs)
+
+    @staticmethod
+    def _uses_lookups(node):
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if isinstance(current, dict):
+                if len(current) == 1 and next(iter(current)) in LOOKUPS:
+                    return True
+                stack.extend(current.values())
+            elif isinstance(current, list):
+                stack.extend(current)
+        return False
+
+    @staticmethod
+    def _key(inputs, default_region, parameters):
+        if inputs is None:
+            return (default_region, Plan._freeze(parameters))
+        return tuple(
+                default_region if name == 'AWS::Region' else (name in parameters, Plan._freeze(parameters.get(name)))
+                for name in inputs)
+
+    @staticmethod
+    def _freeze(value):
+        return json.dumps(value, sort_keys=True, default=repr)
@@ -0,0 +1,230 @@
+import contextlib
+import contextvars
+import threading
+import time
+
+@contextlib.contextmanager
+def profile(stats=None):
+    """
+    Measures what templates resolved within the block spend their time on (see Stats), in the current thread (or
+    asyncio task). Outside of it, nothing is measured and the parser runs as usual.
+
+    >>> from aws_parsecf.loaders import resolve
+    >>> template = {'Parameters': {'Stage': {'Type': 'String', 'Default': 'dev'}},
+    ...             'Conditions': {'IsProd': {'Fn::Equals': [{'Ref': 'Stage'}, 'prod']}},
+    ...             'Resources': {'Queue': {'Type': 'AWS::SQS::Queue', 'Properties': {
+    ...                               'QueueName': {'Fn::Sub': '${Stage}-jobs'},
+    ...                               'DelaySeconds': {'Fn::If': ['IsProd', 0, 5]}}},
+    ...                           'Function': {'Type': 'AWS::Lambda::Function', 'Properties': {
+    ...                               'Environment': {'Variables': {'QUEUE': {'Ref': 'Queue'}}}}}}}
+    >>> with profile() as stats:
+    ...     resolved = resolve(template, 'us-east-1')
+    >>> sorted((function_type, calls) for function_type, (calls, total, own) in stats.functions.items())
+    [('Fn::Equals', 1), ('Fn::If', 1), ('Fn::Sub', 1), ('Ref', 3)]
+    >>> sorted(name for section, name in stats.entries if section == 'Resources')
+    ['Function', 'Queue']
+    >>> print(stats.report()) # doctest: +ELLIPSIS
+    functions                         calls    total ms      own ms
+      ...
+    entries                           calls    total ms      own ms
+      ...
+
+    Results are the same as without profiling, e.g. Fn::And still short-circuits:
+
+    >>> template = {'Parameters': {'Stage': {'Type': 'String', 'Default': 'dev'}},
+    ...             'Conditions': {'IsProd': {'Fn::Equals': [{'Ref': 'Stage'}, 'prod']},
+    ...                            'IsProdEast': {'Fn::And': [{'Condition': 'IsProd'},
+    ...                                                       {'Fn::Equals': [{'Fn::Select': [5, []]}, 'never']}]}}}
+    >>> with profile() as stats:
+    ...     resolved = resolve(template, 'us-east-1')
+    >>> resolved['Conditions']
+    {'IsProd': False, 'IsProdEast': False}
+    >>> sorted(name for section, name in stats.entries if section == 'Conditions')
+    ['IsProd', 'IsProdEast']
+
+    Templates resolved by other threads meanwhile aren't measured:
+
+    >>> with profile() as stats:
+    ...     thread = threading.Thread(target=resolve, args=(template, 'us-east-1'))
+    ...     thread.start()
+    ...     thread.join()
+    >>> stats.functions
+    {}
+    """
+
+    token = _current.set(stats if stats is not None else Stats())
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+class Stats:
+    """
+    What was measured while profiling, as {key: [calls, total seconds, own seconds]} per kind:
+
+    - functions: per intrinsic function / condition type, own time leaving out the functions and entries it uses
+    - entries: per top-level entry, a (section, name) tuple like ('Resources', 'SomeBucket'), own time leaving out
+      the other entries it uses
+    - aws: per (what, region) fetched from AWS (e.g. ('exports', 'us-east-1'))
+    - loading: per loading step (e.g. 'parse JSON')
+
+    record() is called as each measurement ends, subclasses may override it to get them as they come. The same
+    Stats may be given to profile() in several threads, each measures its own calls.
+    """
+
+    KINDS = ('functions', 'entries', 'aws', 'loading')
+
+    def __init__(self):
+        self.functions = {}
+        self.entries = {}
+        self.aws = {}
+        self.loading = {}
+        # per thread, see _frames()
+        self._threads = threading.local()
+        self._lock = threading.Lock()
+
+    def record(self, kind, key, total, own):
+        with self._lock:
+            counters = getattr(self, kind).get(key)
+            if counters is None:
+                counters = getattr(self, kind)[key] = [0, 0.0, 0.0]
+            counters[0] += 1
+            counters[1] += total
+            counters[2] += own
+
+    def _frames(self):
+        # [time of the measurements within, time of the entries within] of the measurements in progress in this
+        # thread
+        frames = getattr(self._threads, 'frames', None)
+        if frames is None:
+            frames = self._threads.frames = [[0.0, 0.0]]
+        return frames
+
+    def report(self, limit=10):
+        """
+        The limit hottest keys of each kind (by own time), as a table.
+        """
+
+        lines = []
+        for kind in Stats.KINDS:
+            measured = getattr(self, kind)
+            if not measured:
+                continue
+            lines.append("{:30} {:>8} {:>11} {:>11}".format(kind, 'calls', 'total ms', 'own ms'))
+            hottest = sorted(measured.items(), key=lambda item: item[1][2], reverse=True)
+            for key, (calls, total, own) in hottest[:limit]:
+                if isinstance(key, tuple):
+                    key = '.'.join(key) if kind == 'entries' else ' '.join(key)
+                lines.append("  {:28} {:>8} {:>11.3f} {:>11.3f}".format(key, calls, total * 1000, own * 1000))
+        return '\n'.join(lines)
+
+def timed(kind, key):
+    """
+    A context manager measuring its block as key of kind when profiling, doing nothing otherwise.
+    """
+
+    stats = _current.get()
+    if stats is None:
+        return _NOT_PROFILING
+    return _Measurement(stats, kind, key)
+
+def instrument(parser):
+    """
+    Called by every Parser, measures its functions, conditions and entries when profiling.
+    """
+
+    stats = _current.get()
+    if stats is None:
+        return
+
+    # through instance attributes, so the calls between functions (e.g. Fn::Sub's Ref) are measured too
+    for owner in (parser.functions, parser.conditions):
+        for function_type, method in owner.MAP.items():
+            if method != 'evaluate':
+                setattr(owner, method, _measured(stats, 'functions', function_type, getattr(owner, method)))
+    conditions = parser.conditions
+    evaluate = conditions.evaluate
+    def evaluate_condition(condition):
+        if isinstance(condition, str):
+            # a named condition
+            with _Measurement(stats, 'entries', ('Conditions', condition)):
+                return evaluate(condition)
+        return evaluate(condition)
+    conditions.evaluate = evaluate_condition
+
+    for owner in (parser.functions, parser.conditions):
+        owner.handlers = dict((function_type, getattr(owner, method)) for function_type, method in owner.MAP.items())
+    parser.intrinsics = dict(conditions.handlers)
+    del parser.intrinsics['Condition']
+    parser.intrinsics.update(parser.functions.handlers)
+
+    # entries are resolved through exploded() when referred to, and first thing for the whole template so each
+    # gets its own measurement (named conditions through Conditions.evaluate, like the parser does)
+    root = parser.functions.root
+    sections = dict((id(entries), section) for section, entries in root.items() if isinstance(entries, dict)) \
+            if isinstance(root, dict) else {}
+    exploded = parser.exploded
+    def exploded_entry(collection, key):
+        section = sections.get(id(collection))
+        if section is None:
+            return exploded(collection, key)
+        with _Measurement(stats, 'entries', (section, key)):
+            return exploded(collection, key)
+    parser.exploded = exploded_entry
+
+    def entries_first(method):
+        def resolve(current, *args):
+            if current is root and sections:
+                parser._evaluate_conditions()
+                for section, entries in root.items():
+                    if isinstance(entries, dict) and section != 'Conditions':
+                        for name in list(entries):
+                            exploded_entry(entries, name)
+            return method(current, *args)
+        return resolve
+    parser.explode = entries_first(parser.explode)
+    parser.resolve = entries_first(parser.resolve)
+
+def _measured(stats, kind, key, function):
+    def measured(*args):
+        with _Measurement(stats, kind, key):
+            return function(*args)
+    return measured
+
+class _Measurement:
+    def __init__(self, stats, kind, key):
+        self.stats = stats
+        self.kind = kind
+        self.key = key
+
+    def __enter__(self):
+        self.frame = [0.0, 0.0]
+        self.frames = self.stats._frames()
+        self.frames.append(self.frame)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exception):
+        total = time.perf_counter() - self.start
+        frames = self.frames
+        frames.pop()
+        parent = frames[-1]
+        parent[0] += total
+        if self.kind == 'entries':
+            parent[1] += total
+            own = total - self.frame[1]
+        else:
+            parent[1] += self.frame[1]
+            own = total - self.frame[0]
+        self.stats.record(self.kind, self.key, total, own)
+
+class _NotProfiling:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exception):
+        pass
+
+_NOT_PROFILING = _NotProfiling()
+
+# the Stats of the innermost profile() block of the current thread / asyncio task
+_current = contextvars.ContextVar('aws_parsecf.profiling', default=None)
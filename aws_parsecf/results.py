@@ -0,0 +1,319 @@
+from aws_parsecf.common import UnknownValue, configured_region
+from aws_parsecf.loaders import _parse_json
+from aws_parsecf.lookups import Lookups
+import collections
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zlib
+
+class ResultCache:
+    """
+    Resolved templates by a hash of the template's bytes, region and parameters, for the load_* functions (cache=)
+    so resolving the same template again costs hashing it and loading the result. The Fn::GetAZs / Fn::ImportValue
+    values a template used are kept with its result, which is resolved again once they changed.
+
+    The size most recently used results are kept in memory, and with a directory path, up to disk_size bytes of
+    them on disk too, shared with other processes (and hosts, on a shared file system). Results are stored as JSON
+    (data only, so a shared directory can't run code in its readers), each load gives a fresh copy. Results that
+    can't be stored that way (e.g. binary YAML values) are resolved every time.
+
+    >>> import shutil
+    >>> from aws_parsecf.loaders import loads_json
+
+    >>> path = tempfile.mkdtemp()
+    >>> cache = ResultCache(path)
+    >>> template = '{"Outputs": {"Vpc": {"Value": {"Fn::ImportValue": "SharedVpc"}}}}'
+    >>> lookups = Lookups(exports={'us-east-1': {'SharedVpc': 'vpc-12345678'}})
+    >>> loads_json(template, 'us-east-1', lookups=lookups, cache=cache)
+    {'Outputs': {'Vpc': {'Value': 'vpc-12345678'}}}
+    >>> loads_json(template, 'us-east-1', lookups=lookups, cache=cache)
+    {'Outputs': {'Vpc': {'Value': 'vpc-12345678'}}}
+    >>> cache.hits, cache.misses
+    (1, 1)
+
+    From disk, in another process:
+
+    >>> loads_json(template, 'us-east-1', lookups=lookups, cache=ResultCache(path)) == {'Outputs': {'Vpc': {'Value': 'vpc-12345678'}}}
+    True
+
+    Once the export changed:
+
+    >>> loads_json(template, 'us-east-1', lookups=Lookups(exports={'us-east-1': {'SharedVpc': 'vpc-87654321'}}), cache=cache)
+    {'Outputs': {'Vpc': {'Value': 'vpc-87654321'}}}
+    >>> cache.hits, cache.misses
+    (1, 2)
+    >>> shutil.rmtree(path)
+    """
+
+    # part of every key, bumped when resolving or the stored format changes so results of older versions aren't used
+    VERSION = 2
+    # file name suffix of the results on disk
+    SUFFIX = '.result'
+
+    def __init__(self, path=None, size=128, disk_size=256 * 1024 * 1024):
+        self.path = path
+        self.size = size
+        self.disk_size = disk_size
+        self.hits = 0
+        self.misses = 0
+        # key -> encoded (lookups used, result), see _encode(), least recently used first
+        self._memory = collections.OrderedDict()
+        # bytes on disk, counted on first write
+        self._disk_used = None
+        # id(lookup value) -> (value, digest), values are shared by the lookup caches so each is digested once
+        self._digests = {}
+        self._lock = threading.Lock()
+        if path and not os.path.isdir(path):
+            os.makedirs(path)
+
+    def resolve(self, data, kind, default_region, parameters, lookups, load):
+        """
+        The cached result of the template data (str or bytes-like) of kind ('JSON' or 'YAML'), or of
+        load(default_region, lookups) which resolves it.
+
+        default_region=None is looked up in the aws configuration, as the key depends on it.
+        """
+
+        if default_region is None:
+            default_region = configured_region()
+        if lookups is None:
+            lookups = Lookups()
+        key = self.key(data, kind, default_region, parameters)
+
+        entry = self._get(key)
+        cached = _decode(entry) if entry is not None else None
+        if cached is not None and self._fresh(cached[0], lookups):
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+
+        recording = _Recording(lookups, self._digest)
+        result = load(default_region, recording)
+        try:
+            entry = _encode(sorted(recording.used.items()), result)
+        except (TypeError, ValueError, RecursionError):
+            # not data JSON can hold
+            return result
+        self._put(key, entry)
+        return result
+
+    def _fresh(self, used, lookups):
+        # the lookups used still have the same values
+        for lookup, region, digest in used:
+            if lookup not in _Recording.LOOKUPS or self._digest(getattr(lookups, lookup)(region)) != digest:
+                return False
+        return True
+
+    def key(self, data, kind, default_region, parameters):
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(json.dumps([ResultCache.VERSION, kind, default_region, parameters], sort_keys=True,
+                                 default=repr).encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(data.encode('utf-8') if isinstance(data, str) else data)
+        return digest.hexdigest()
+
+    def clear(self):
+        """
+        Forgets every result, in memory and on disk.
+        """
+
+        with self._lock:
+            self._memory.clear()
+            if self.path:
+                for name in os.listdir(self.path):
+                    if name.endswith(ResultCache.SUFFIX):
+                        self._remove(os.path.join(self.path, name))
+                self._disk_used = 0
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+        if not self.path:
+            return None
+        path = os.path.join(self.path, key + ResultCache.SUFFIX)
+        try:
+            with open(path, 'rb') as f:
+                entry = zlib.decompress(f.read())
+            # recently used, see _evict()
+            os.utime(path)
+        except (IOError, OSError, zlib.error):
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def _put(self, key, entry):
+        self._remember(key, entry)
+        if not self.path:
+            return
+        compressed = zlib.compress(entry, 1)
+        # written aside then renamed, so other processes never read half a result
+        descriptor, temporary = tempfile.mkstemp(dir=self.path)
+        with os.fdopen(descriptor, 'wb') as f:
+            f.write(compressed)
+        os.replace(temporary, os.path.join(self.path, key + ResultCache.SUFFIX))
+        with self._lock:
+            if self._disk_used is None:
+                self._evict()
+            else:
+                self._disk_used += len(compressed)
+                if self._disk_used > self.disk_size:
+                    self._evict()
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.size:
+                self._memory.popitem(last=False)
+
+    def _evict(self):
+        # other processes write there too, so what's on disk is counted again, and the least recently used results
+        # go until it's 10% under disk_size so this doesn't happen on every write
+        files = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(ResultCache.SUFFIX):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue # removed meanwhile
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        self._disk_used = sum(size for _, size, _ in files)
+        if self._disk_used <= self.disk_size:
+            return
+        files.sort()
+        for _, size, path in files:
+            if self._disk_used <= self.disk_size * 0.9:
+                break
+            self._remove(path)
+            self._disk_used -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass # removed by another process
+
+    def _digest(self, value):
+        known = self._digests.get(id(value))
+        if known is not None and known[0] is value:
+            return known[1]
+        digest = hashlib.blake2b(json.dumps(value, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
+        if len(self._digests) > 1024:
+            self._digests.clear()
+        self._digests[id(value)] = (value, digest)
+        return digest
+
+class _Recording:
+    # Lookups for a resolution, recording {(lookup, region): digest of the value} of what it used
+
+    LOOKUPS = ('availability_zones', 'exports')
+
+    def __init__(self, lookups, digest):
+        self.lookups = lookups
+        self.digest = digest
+        self.used = {}
+
+    def availability_zones(self, region):
+        return self._record('availability_zones', region)
+
+    def exports(self, region):
+        return self._record('exports', region)
+
+    def _record(self, lookup, region):
+        value = getattr(self.lookups, lookup)(region)
+        self.used[(lookup, region)] = self.digest(value)
+        return value
+
+def _encode(used, result):
+    """
+    used ([((lookup, region), digest)]) and result as JSON, values JSON can't hold as is (UnknownValue, dates,
+    non-string keys) stored as what it can along with their paths, to be restored by _decode().
+
+    >>> result = {'Arn': UnknownValue('ATT: Queue.Arn'), 'Version': datetime.date(2010, 9, 9), 1: [2.5, None]}
+    >>> used, decoded = _decode(_encode([(('exports', 'us-east-1'), 'ab12')], result))
+    >>> used, decoded == result, decoded['Arn'].key
+    ([('exports', 'us-east-1', 'ab12')], True, 'ATT: Queue.Arn')
+    >>> _decode(b'{"not": "an entry"}') is None
+    True
+    >>> _encode([], {'Value': b'binary'})
+    Traceback (most recent call last):
+        ...
+    TypeError: bytes isn't stored
+    """
+
+    # [(path, kind)], children before their parents
+    restores = []
+    plain = _plain(result, [], restores)
+    data = [[lookup, region, digest] for (lookup, region), digest in used], restores, plain
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def _decode(entry):
+    # (used, result), or None if entry wasn't written by _encode()
+    try:
+        used, restores, result = _parse_json(entry)
+        for path, kind in restores:
+            if not path:
+                result = _RESTORE[kind](result)
+                continue
+            container = result
+            for key in path[:-1]:
+                container = container[key]
+            container[path[-1]] = _RESTORE[kind](container[path[-1]])
+        return [(lookup, region, digest) for lookup, region, digest in used], result
+    except (TypeError, ValueError, KeyError, IndexError):
+        return None
+
+def _plain(node, path, restores):
+    if isinstance(node, UnknownValue):
+        restores.append((list(path), 'unknown'))
+        return str(node)
+    if node is None or isinstance(node, (str, bool, int, float)):
+        return node
+    if isinstance(node, list):
+        plain = []
+        for index, value in enumerate(node):
+            path.append(index)
+            plain.append(_plain(value, path, restores))
+            path.pop()
+        return plain
+    if isinstance(node, dict):
+        plain = {}
+        if all(isinstance(key, str) for key in node):
+            for key, value in node.items():
+                path.append(key)
+                plain[key] = _plain(value, path, restores)
+                path.pop()
+            return plain
+        # as [[key, value]]
+        plain = []
+        for index, (key, value) in enumerate(node.items()):
+            path.extend((index, 0))
+            pair = [_plain(key, path, restores)]
+            path[-1] = 1
+            pair.append(_plain(value, path, restores))
+            del path[-2:]
+            plain.append(pair)
+        restores.append((list(path), 'dict'))
+        return plain
+    if isinstance(node, datetime.datetime):
+        restores.append((list(path), 'datetime'))
+        return node.isoformat()
+    if isinstance(node, datetime.date):
+        restores.append((list(path), 'date'))
+        return node.isoformat()
+    raise TypeError("{} isn't stored".format(type(node).__name__))
+
+# kind -> function restoring the value _plain() stored
+_RESTORE = {
+        'unknown': lambda value: UnknownValue(value[UnknownValue.PREFIX_LENGTH:]),
+        'dict': lambda pairs: dict((key, value) for key, value in pairs),
+        'datetime': datetime.datetime.fromisoformat,
+        'date': datetime.date.fromisoformat,
+        }
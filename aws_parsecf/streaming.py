@@ -0,0 +1,303 @@
+from aws_parsecf.common import DELETE
+from aws_parsecf.dependencies import scan
+from aws_parsecf.loaders import _parse_json
+from aws_parsecf.parser import Parser
+import array
+import bisect
+import heapq
+import json
+import re
+
+def iter_resources(template, default_region=None, parameters={}, lookups=None, cache_size=256):
+    """
+    Resolves the resources of a parsed template one at a time, yielding (logical id, resolved resource) pairs in
+    template order, without the resources removed by their condition. The conditions are evaluated first, then a
+    resource stays resolved only while later ones refer to it (at most cache_size of them, the others are resolved
+    again when needed), so memory doesn't grow with the resources already consumed.
+
+    >>> template = {
+    ...     'Parameters': {'Stage': {'Type': 'String', 'Default': 'dev'}},
+    ...     'Conditions': {'IsProd': {'Fn::Equals': [{'Ref': 'Stage'}, 'prod']}},
+    ...     'Resources': {
+    ...         'Queue': {'Type': 'AWS::SQS::Queue', 'Properties': {'QueueName': {'Fn::Sub': '${Stage}-jobs'}}},
+    ...         'Alarm': {'Type': 'AWS::CloudWatch::Alarm', 'Condition': 'IsProd'},
+    ...         'Function': {'Type': 'AWS::Lambda::Function', 'Properties': {
+    ...             'MemorySize': {'Fn::If': ['IsProd', 1024, 128]},
+    ...             'Environment': {'Variables': {'QUEUE': {'Fn::GetAtt': ['Queue', 'QueueName']}}}}}}}
+    >>> for name, resource in iter_resources(template, 'us-east-1'):
+    ...     print(name, resource['Properties'])
+    Queue {'QueueName': 'dev-jobs'}
+    Function {'MemorySize': 128, 'Environment': {'Variables': {'QUEUE': 'dev-jobs'}}}
+    """
+
+    resources = template.get('Resources', {})
+    references = [_references(template, template.get('Conditions', {}))]
+    references.extend(_references(template, resource) for resource in resources.values())
+    parser = Parser(template, default_region, parameters, in_place=False, lookups=lookups)
+    # the template stays whole, so there's nothing to load
+    return _resources(template, references, parser, lambda name: None, lambda name: None, cache_size)
+
+def iter_resources_file(path, default_region=None, parameters={}, lookups=None, cache_size=256):
+    """
+    Like iter_resources but for a JSON template file, which is never parsed whole: the resources are read from it
+    one at a time (and read again if resolved again), Outputs aren't read at all.
+
+    >>> import json, os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'template.json')
+    >>> with open(path, 'w') as f:
+    ...     json.dump({'Resources': {
+    ...         'Bucket': {'Type': 'AWS::S3::Bucket', 'Properties': {'BucketName': {'Fn::Sub': 'logs-${AWS::Region}'}}},
+    ...         'Trail': {'Type': 'AWS::CloudTrail::Trail', 'Properties': {'S3BucketName': {'Ref': 'Bucket'}}}}}, f)
+    >>> list(iter_resources_file(path, 'us-east-1'))
+    [('Bucket', {'Type': 'AWS::S3::Bucket', 'Properties': {'BucketName': 'logs-us-east-1'}}), ('Trail', {'Type': 'AWS::CloudTrail::Trail', 'Properties': {'S3BucketName': 'logs-us-east-1'}})]
+    """
+
+    with open(path, 'rb') as f:
+        def read(start, end):
+            f.seek(start)
+            return _parse_json(f.read(end - start))
+
+        # the other sections are small, the resources are only kept as their offsets in the file
+        sections = {}
+        resources = {}
+        starts = array.array('q')
+        ends = array.array('q')
+        # until all the names are known, any name may be a parameter's (for Ref) or a resource's
+        references = [None]
+        for member, value, start, end in _members(f):
+            if len(member) == 2:
+                # not loaded, the resource's position
+                resources[member[1]] = len(starts)
+                starts.append(start)
+                ends.append(end)
+                candidates, _, dynamic = scan(_ANY_NAME, value)
+                references.append(None if dynamic else tuple(
+                        (section, name) for section, name in candidates if section in ('Parameters', 'Resources')))
+            elif member[0] not in ('Resources', 'Outputs'):
+                sections[member[0]] = (start, end)
+        sections = dict((section, read(*span)) for section, span in sections.items())
+        sections['Resources'] = resources
+
+        references[0] = _references(sections, sections.get('Conditions', {}))
+        parameters_section = sections.get('Parameters', {})
+        for position, candidates in enumerate(references[1:], 1):
+            if candidates:
+                # like scan() would have
+                references[position] = tuple(name for section, name in candidates if name in resources and (
+                        section == 'Resources' or name not in parameters_section))
+
+        def load(name):
+            position = resources[name]
+            resources[name] = read(starts[position], ends[position])
+            loaded[name] = position
+        def unload(name):
+            resources[name] = loaded.pop(name)
+        # name -> position of the loaded resources
+        loaded = {}
+        parser = Parser(sections, default_region, parameters, in_place=False, lookups=lookups)
+        for pair in _resources(sections, references, parser, load, unload, cache_size):
+            yield pair
+
+class _AnyName:
+    # a section with every name, for scan()
+
+    def __contains__(self, name):
+        return True
+
+_ANY_NAME = {'Parameters': _AnyName(), 'Resources': _AnyName()}
+
+def _references(template, node):
+    # names of the resources node refers to, None if it may be any
+    references, regional, dynamic = scan(template, node)
+    if dynamic:
+        return None
+    return tuple(name for section, name in references if section == 'Resources')
+
+def _resources(root, references, parser, load, unload, cache_size):
+    """
+    Resolves root's resources in order, references being the resources each step refers to: step 0 evaluates the
+    conditions, step i resolves the i-th resource.
+    """
+
+    resources = root.get('Resources', {})
+    names = list(resources)
+    positions = dict((name, position) for position, name in enumerate(names, 1))
+    # resource name -> the (other) steps needing it resolved, for the resources referred to
+    uses = {}
+    for step, referenced in enumerate(references):
+        for name in _needed(referenced, references, positions, names):
+            if positions[name] != step:
+                uses.setdefault(name, []).append(step)
+
+    # resource name -> its next use, for the ones kept resolved, and a heap of (-next use, name) to drop the one
+    # needed last when there are too many (some are outdated, they don't match next_uses)
+    next_uses = {}
+    furthest = []
+    for step, referenced in enumerate(references):
+        needed = _needed(referenced, references, positions, names)
+        if step:
+            needed.add(names[step - 1])
+        for name in needed:
+            if name not in next_uses:
+                load(name)
+        if step:
+            name = names[step - 1]
+            resolved = parser.exploded(resources, name)
+            if resolved is not DELETE:
+                yield name, resolved
+        else:
+            parser.conditions.evaluate_all()
+
+        for name in needed:
+            later = uses.get(name, ())
+            position = bisect.bisect_right(later, step)
+            if position < len(later):
+                next_uses[name] = later[position]
+                heapq.heappush(furthest, (-later[position], name))
+            else:
+                next_uses.pop(name, None)
+                _drop(parser, resources, name, unload)
+        while len(next_uses) > cache_size:
+            next_use, name = heapq.heappop(furthest)
+            if next_uses.get(name) == -next_use:
+                del next_uses[name]
+                _drop(parser, resources, name, unload)
+
+def _needed(referenced, references, positions, names):
+    # resources referenced needs resolved, transitively
+    if referenced is None:
+        return set(names)
+    found = set()
+    stack = list(referenced)
+    while stack:
+        name = stack.pop()
+        if name in found or name not in positions:
+            continue
+        found.add(name)
+        indirect = references[positions[name]]
+        if indirect is None:
+            return set(names)
+        stack.extend(indirect)
+    return found
+
+def _drop(parser, resources, name, unload):
+    parser.forget(resources[name])
+    parser.functions._attributes_cache.pop(name, None)
+    unload(name)
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+class _Scanner:
+    """
+    A JSON file read a chunk at a time, decoded as latin-1 so offsets in the text are offsets in the file.
+    """
+
+    def __init__(self, f, chunk_size=1 << 20):
+        self.f = f
+        self.chunk_size = chunk_size
+        # what's left to scan of the chunks read, at offset in the file
+        self.text = ''
+        self.offset = 0
+        self.position = 0
+
+    def next(self):
+        """
+        The next character that isn't whitespace, consumed.
+        """
+
+        while True:
+            self.position = _WHITESPACE.match(self.text, self.position).end()
+            if self.position < len(self.text):
+                self.position += 1
+                return self.text[self.position - 1]
+            if not self._read():
+                raise ValueError("Unexpected end of JSON at {}".format(self.offset + self.position))
+
+    def value(self):
+        """
+        (value, start, end) of the next value, start and end being offsets in the file.
+        """
+
+        self.next()
+        self.position -= 1
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.position)
+            except ValueError:
+                # possibly cut off by the end of the chunk
+                if self._read():
+                    continue
+                raise
+            if end == len(self.text) and self._read():
+                # a number may continue in the next chunk
+                continue
+            start = self.offset + self.position
+            self.position = end
+            return value, start, self.offset + end
+
+    def keys(self):
+        """
+        The keys of the object whose '{' was just scanned, its value must be scanned after each one.
+        """
+
+        char = self.next()
+        if char == '}':
+            return
+        while True:
+            if char != '"':
+                raise ValueError("Expecting a key at {}".format(self.offset + self.position - 1))
+            self.position -= 1
+            _, start, end = self.value()
+            # decoded again, as UTF-8
+            key = json.loads(self.text[start - self.offset:end - self.offset].encode('latin-1'))
+            if self.next() != ':':
+                raise ValueError("Expecting ':' at {}".format(self.offset + self.position - 1))
+            yield key
+            char = self.next()
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError("Expecting ',' at {}".format(self.offset + self.position - 1))
+            char = self.next()
+
+    def _read(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.offset += self.position
+        self.text = self.text[self.position:] + chunk.decode('latin-1')
+        self.position = 0
+        return True
+
+def _members(f):
+    """
+    (path, value, start, end) of the top-level members, path being (key,), and of the members of Resources, path
+    being ('Resources', logical id), start and end being the file offsets of their value. Values are decoded as
+    latin-1 (which keeps logical ids and the like, they're alphanumeric), only those of the resources are given.
+
+    >>> import io
+    >>> data = b'{"A": [1, {"B": 2}], "Resources": {"R": {"S": "}\\\\"\\\\\\\\"}}, "C": 12}'
+    >>> for path, value, start, end in _members(io.BytesIO(data)):
+    ...     print(path, value, data[start:end])
+    ('A',) None b'[1, {"B": 2}]'
+    ('Resources', 'R') {'S': '}"\\\\'} b'{"S": "}\\\\"\\\\\\\\"}'
+    ('Resources',) None b'{"R": {"S": "}\\\\"\\\\\\\\"}}'
+    ('C',) None b'12'
+    """
+
+    scanner = _Scanner(f)
+    if scanner.next() != '{':
+        raise ValueError("Expecting a JSON object")
+    for section in scanner.keys():
+        if section == 'Resources':
+            if scanner.next() == '{':
+                start = scanner.offset + scanner.position - 1
+                for name in scanner.keys():
+                    value, value_start, value_end = scanner.value()
+                    yield ('Resources', name), value, value_start, value_end
+                yield ('Resources',), None, start, scanner.offset + scanner.position
+                continue
+            scanner.position -= 1
+        _, start, end = scanner.value()
+        yield (section,), None, start, end
@@ -0,0 +1,55 @@
+from aws_parsecf.conditions import Conditions
+from aws_parsecf.functions import Functions
+import yaml
+
+# LibYAML's loader when PyYAML was built with it, it's many times faster than the pure Python one
+try:
+    from yaml import CSafeLoader as BaseLoader
+except ImportError:
+    from yaml import SafeLoader as BaseLoader
+
+class Loader(BaseLoader):
+    """
+    Safe YAML loader that also reads CloudFormation's short forms (!Ref, !GetAtt, !Sub...) into their long forms.
+
+    >>> yaml.load('''
+    ... Resources:
+    ...   SomeBucket:
+    ...     Condition: IsProd
+    ...     Type: AWS::S3::Bucket
+    ...     Properties:
+    ...       BucketName: !Sub '${AWS::StackName}-bucket'
+    ...       Tags:
+    ...         - Key: !Select [0, !GetAZs '']
+    ...           Value: !GetAtt SomeRole.Arn
+    ... Conditions:
+    ...   IsProd: !And [!Equals [!Ref Stage, prod], !Not [!Condition IsDev]]
+    ... ''', Loader=Loader)
+    {'Resources': {'SomeBucket': {'Condition': 'IsProd', 'Type': 'AWS::S3::Bucket',
+                                  'Properties': {'BucketName': {'Fn::Sub': '${AWS::StackName}-bucket'},
+                                                 'Tags': [{'Key': {'Fn::Select': [0, {'Fn::GetAZs': ''}]},
+                                                           'Value': {'Fn::GetAtt': ['SomeRole', 'Arn']}}]}}},
+     'Conditions': {'IsProd': {'Fn::And': [{'Fn::Equals': [{'Ref': 'Stage'}, 'prod']},
+                                           {'Fn::Not': [{'Condition': 'IsDev'}]}]}}}
+    """
+
+def _short_form(function_type):
+    # Fn::Sub -> !Sub, Ref -> !Ref
+    return '!' + function_type.split('::')[-1]
+
+def _constructor(function_type):
+    def construct(loader, node):
+        if isinstance(node, yaml.ScalarNode):
+            value = loader.construct_scalar(node)
+            if function_type == 'Fn::GetAtt':
+                # !GetAtt Resource.Attribute
+                value = value.split('.', 1)
+        elif isinstance(node, yaml.SequenceNode):
+            value = loader.construct_sequence(node, deep=True)
+        else:
+            value = loader.construct_mapping(node, deep=True)
+        return {function_type: value}
+    return construct
+
+for function_type in set(Functions.MAP) | set(Conditions.MAP):
+    Loader.add_constructor(_short_form(function_type), _constructor(function_type))
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Wall time of resolving a template using Fn::GetAZs of several regions and Fn::ImportValue, with load_json (one
+round trip after the other) against load_json_async (concurrent round trips), through stub clients with latency.
+
+    python benchmarks/async_lookups.py [--regions 6] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import aws_parsecf
+from aws_parsecf.asynchronous import load_json_async
+from aws_parsecf.lookups import AvailabilityZonesCache, ExportsCache, Lookups
+import stubs
+from templates import REGIONS
+
+def template(regions):
+    outputs = dict(('Zones{}'.format(index), {'Value': {'Fn::GetAZs': region}})
+                   for index, region in enumerate(regions))
+    outputs['Vpc'] = {'Value': {'Fn::ImportValue': 'Export0'}}
+    return json.dumps({'Outputs': outputs})
+
+def fresh():
+    # nothing cached, so every run goes through the stubs
+    return Lookups(availability_zones_cache=AvailabilityZonesCache(), exports_cache=ExportsCache())
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--regions', type=int, default=6)
+    arguments.add_argument('--latency', type=float, default=0.05, help="seconds per AWS call")
+    options = arguments.parse_args()
+
+    regions = REGIONS[:options.regions]
+    string = template(regions)
+    stubs.LATENCY = options.latency
+    with stubs.stubbed_boto3():
+        start = time.perf_counter()
+        blocking = aws_parsecf.load_json(io.StringIO(string), 'us-east-1', lookups=fresh())
+        blocking_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        concurrent = asyncio.run(load_json_async(io.StringIO(string), 'us-east-1', lookups=fresh()))
+        concurrent_time = time.perf_counter() - start
+
+    if blocking != concurrent:
+        sys.exit("FAIL: load_json_async resolved a different template")
+    print("zones of {} regions and exports, {:.0f}ms per call: load_json {:.0f}ms, load_json_async {:.0f}ms".format(
+            len(regions), options.latency * 1000, blocking_time * 1000, concurrent_time * 1000))
+    if len(regions) > 1 and concurrent_time > blocking_time / 2:
+        sys.exit("FAIL: load_json_async didn't fetch concurrently")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+Time of cleanup after explode (in place) on growing lists where every other entry is an Fn::If to AWS::NoValue,
+like long security group rule or IAM statement lists, which should grow linearly; resolve for comparison.
+
+    python benchmarks/cleanup.py [--entries 10000 40000 160000] [--runs 5]
+"""
+
+import argparse
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from aws_parsecf import resolve
+from aws_parsecf.parser import Parser
+
+def template(entries):
+    rules = [{'Fn::If': ['Never', {'CidrIp': '10.0.{}.0/24'.format(index % 256), 'FromPort': index},
+                         {'Ref': 'AWS::NoValue'}]}
+             if index % 2 else {'CidrIp': '10.1.{}.0/24'.format(index % 256), 'FromPort': index}
+             for index in range(entries)]
+    return {'Conditions': {'Never': {'Fn::Equals': ['a', 'b']}},
+            'Resources': {'SecurityGroup': {'Type': 'AWS::EC2::SecurityGroup',
+                                            'Properties': {'SecurityGroupIngress': rules}}}}
+
+def in_place(root):
+    root = copy.deepcopy(root)
+    parser = Parser(root, 'us-east-1')
+    parser.explode(root)
+    start = time.process_time()
+    parser.cleanup(root)
+    return time.process_time() - start, root
+
+def single_pass(root):
+    start = time.process_time()
+    resolved = resolve(root, 'us-east-1')
+    return time.process_time() - start, resolved
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--entries', type=int, nargs='+', default=[10000, 40000, 160000])
+    arguments.add_argument('--runs', type=int, default=5)
+    options = arguments.parse_args()
+
+    timings = {'cleanup': [], 'resolve': []}
+    print("{:>10} {:>14} {:>14}".format('entries', 'cleanup ms', 'resolve ms'))
+    for entries in options.entries:
+        root = template(entries)
+        best = {}
+        for name, operation in (('cleanup', in_place), ('resolve', single_pass)):
+            results = [operation(root) for _ in range(options.runs)]
+            best[name] = min(elapsed for elapsed, _ in results)
+            timings[name].append(best[name])
+            rules = results[0][1]['Resources']['SecurityGroup']['Properties']['SecurityGroupIngress']
+            if len(rules) != (entries + 1) // 2 or any(rule['FromPort'] % 2 for rule in rules):
+                sys.exit("FAIL: {} kept the wrong rules".format(name))
+        print("{:>10} {:>14.2f} {:>14.2f}".format(entries, best['cleanup'] * 1000, best['resolve'] * 1000))
+
+    # linear within a factor of 2 (the CPU speed varies), quadratic would be entries ratio times more
+    ratio = float(options.entries[-1]) / options.entries[0]
+    growth = timings['cleanup'][-1] / max(timings['cleanup'][0], 1e-9)
+    if len(options.entries) > 1 and growth > ratio * 2:
+        sys.exit("FAIL: cleanup grew faster than the entries ({:.1f}x for {:.0f}x)".format(growth, ratio))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+"""
+CPU time of getting boto3 clients for lookups, created every time (boto3.client) against the shared pool
+(aws_parsecf.lookups.Clients). Needs boto3, nothing is sent to AWS.
+
+    python benchmarks/clients.py [--calls 200] [--regions 4]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from aws_parsecf.lookups import Clients
+from templates import REGIONS
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--calls', type=int, default=200)
+    arguments.add_argument('--regions', type=int, default=4)
+    options = arguments.parse_args()
+    import boto3
+
+    regions = REGIONS[:options.regions]
+    calls = [(service, regions[index % len(regions)])
+             for index, service in enumerate(['ec2', 'cloudformation'] * (options.calls // 2))]
+
+    start = time.process_time()
+    for service, region in calls:
+        boto3.client(service, region_name=region)
+    created = time.process_time() - start
+
+    clients = Clients()
+    start = time.process_time()
+    for service, region in calls:
+        clients.get(service, region)
+    pooled = time.process_time() - start
+
+    print("{} clients: boto3.client {:.0f}ms, Clients.get {:.0f}ms".format(len(calls), created * 1000, pooled * 1000))
+    if pooled > created / 2:
+        sys.exit("FAIL: the pool didn't save creating clients")
+
+if __name__ == '__main__':
+    main()
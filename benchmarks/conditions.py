@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Truth tables of the Conditions section: the conditions() evaluator compared with resolving the whole template, on
+a template with many conditions chained through Fn::And / Fn::Or / Fn::Not and referenced by many Fn::If.
+
+    python benchmarks/conditions.py [--conditions 500] [--resources 5000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import aws_parsecf
+from aws_parsecf.loaders import conditions
+
+def generate(conditions, resources):
+    template = {
+        'Parameters': {'Stage': {'Type': 'String', 'Default': 'dev'}},
+        'Conditions': {'C0': {'Fn::Equals': [{'Ref': 'Stage'}, 'prod']}},
+        'Resources': {},
+    }
+    for index in range(1, conditions):
+        previous = {'Condition': "C{}".format(index - 1)}
+        equals = {'Fn::Equals': [{'Ref': 'AWS::Region'}, "region-{}".format(index)]}
+        template['Conditions']["C{}".format(index)] = [
+            {'Fn::Not': [previous]},
+            {'Fn::And': [previous, equals]},
+            {'Fn::Or': [previous, equals]},
+        ][index % 3]
+    for index in range(resources):
+        template['Resources']["Resource{}".format(index)] = {
+            'Type': 'AWS::SNS::Topic',
+            'Condition': "C{}".format(index % conditions),
+            'Properties': {'TopicName': {'Fn::If': ["C{}".format((index * 7) % conditions), 'a', 'b']}},
+        }
+    return template
+
+def measure(run, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.process_time()
+        result = run()
+        timings.append(time.process_time() - start)
+    return min(timings), result
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--conditions', type=int, default=500)
+    arguments.add_argument('--resources', type=int, default=5000)
+    arguments.add_argument('--runs', type=int, default=5)
+    options = arguments.parse_args()
+
+    template = generate(options.conditions, options.resources)
+    elapsed, resolved = measure(lambda: aws_parsecf.resolve(template, 'us-east-1')['Conditions'], options.runs)
+    print("{:12} {:8.1f}ms".format('resolve', elapsed * 1000))
+    elapsed, evaluated = measure(lambda: conditions(template, 'us-east-1'), options.runs)
+    print("{:12} {:8.1f}ms".format('conditions', elapsed * 1000))
+
+    if resolved != evaluated:
+        sys.exit("FAIL: results differ")
+
+if __name__ == '__main__':
+    main()
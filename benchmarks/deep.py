@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Per-node cost of the explicit stack traversals on deep and wide synthetic templates, compared with the
+previous recursive explode + cleanup.
+
+    python benchmarks/deep.py [--nodes 30000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from aws_parsecf.common import DELETE
+from aws_parsecf.parser import Parser
+
+class RecursiveParser(Parser):
+    """
+    explode and cleanup as they were before the explicit stack.
+    """
+
+    def explode(self, current):
+        if isinstance(current, dict):
+            if '_exploded' in current:
+                return
+            current['_exploded'] = True
+            for key in current:
+                self.exploded(current, key)
+            return self._explode_object(current)
+        elif isinstance(current, list):
+            for index in range(len(current)):
+                self.exploded(current, index)
+
+    def cleanup(self, current):
+        if isinstance(current, dict):
+            if '_exploded' in current:
+                del current['_exploded']
+            for key, value in list(current.items()):
+                if value is DELETE:
+                    del current[key]
+                else:
+                    self.cleanup(value)
+        elif isinstance(current, list):
+            deleted = 0
+            for index, value in enumerate(list(current)):
+                if value is DELETE:
+                    del current[index - deleted]
+                    deleted += 1
+                else:
+                    self.cleanup(value)
+
+def nested_joins(depth):
+    # Fn::Join inside Fn::Join inside ...
+    current = {'Ref': 'AWS::Region'}
+    for _ in range(depth):
+        current = {'Fn::Join': ['-', ['a', current]]}
+    return {'Outputs': {'Deep': {'Value': current}}}
+
+def nested_states(depth):
+    # a Step Functions like definition, Parallel states all the way down
+    current = {'Type': 'Pass', 'End': True}
+    for index in range(depth):
+        current = {'Type': 'Parallel', 'Branches': [{'StartAt': 'S{}'.format(index), 'States': {'S{}'.format(index): current}}]}
+    return {'Resources': {'StateMachine': {'Type': 'AWS::StepFunctions::StateMachine',
+                                           'Properties': {'Definition': current}}}}
+
+def wide(width):
+    return {'Resources': {'Wide': {'Type': 'AWS::EC2::SecurityGroup', 'Properties': {'SecurityGroupIngress': [
+        {'IpProtocol': 'tcp', 'FromPort': index, 'ToPort': index, 'CidrIp': {'Fn::Sub': '10.0.${AWS::Region}.0/24'}}
+        for index in range(width)]}}}}
+
+def count(current):
+    nodes = 0
+    stack = [current]
+    while stack:
+        current = stack.pop()
+        nodes += 1
+        if isinstance(current, dict):
+            stack.extend(current.values())
+        elif isinstance(current, list):
+            stack.extend(current)
+    return nodes
+
+def in_place(parser_class):
+    def run(template):
+        parser = parser_class(template, 'us-east-1')
+        parser.explode(template)
+        parser.cleanup(template)
+    run.__name__ = parser_class.__name__
+    return run
+
+def resolve(template):
+    Parser(template, 'us-east-1', in_place=False).resolve(template)
+
+def measure(run, build, runs):
+    timings = []
+    for _ in range(runs):
+        # copy.deepcopy is recursive too, build a fresh template instead
+        template = build()
+        start = time.process_time()
+        try:
+            run(template)
+        except RecursionError:
+            return None
+        timings.append(time.process_time() - start)
+    return min(timings)
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--nodes', type=int, default=30000)
+    arguments.add_argument('--runs', type=int, default=5)
+    options = arguments.parse_args()
+
+    scenarios = [
+        ('joins, shallow', lambda: nested_joins(100)),
+        ('joins, deep', lambda: nested_joins(options.nodes // 5)),
+        ('states, shallow', lambda: nested_states(50)),
+        ('states, deep', lambda: nested_states(options.nodes // 8)),
+        ('wide', lambda: wide(options.nodes // 12)),
+    ]
+    runs = [in_place(RecursiveParser), in_place(Parser), resolve]
+    print("{:16} {:>8} ".format('scenario', 'nodes') + ' '.join("{:>16}".format(run.__name__) for run in runs))
+    for name, build in scenarios:
+        nodes = count(build())
+        timings = [measure(run, build, options.runs) for run in runs]
+        print("{:16} {:>8} ".format(name, nodes) + ' '.join(
+            "{:>13.3f}us".format(timing / nodes * 1e6) if timing is not None else "{:>16}".format('RecursionError')
+            for timing in timings))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+"""
+Building the dependency graph of a large template and querying it, compared with resolving the template.
+
+    python benchmarks/dependencies.py [--resources 10000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import aws_parsecf
+from templates import generate
+
+def measure(run, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.process_time()
+        result = run()
+        timings.append(time.process_time() - start)
+    return min(timings), result
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--resources', type=int, default=10000)
+    arguments.add_argument('--runs', type=int, default=5)
+    options = arguments.parse_args()
+
+    template = generate(options.resources)
+    elapsed, _ = measure(lambda: aws_parsecf.resolve(template, 'us-east-1'), options.runs)
+    print("{:28} {:8.1f}ms".format('resolve', elapsed * 1000))
+    elapsed, dependencies = measure(lambda: aws_parsecf.graph(template), options.runs)
+    print("{:28} {:8.1f}ms".format('graph', elapsed * 1000))
+    elapsed, order = measure(dependencies.order, options.runs)
+    print("{:28} {:8.1f}ms".format('order', elapsed * 1000))
+    elapsed, affected = measure(lambda: dependencies.blast_radius(('Parameters', 'Environment')), options.runs)
+    print("{:28} {:8.1f}ms ({} entries)".format('blast radius of Environment', elapsed * 1000, len(affected)))
+    elapsed, ordered = measure(lambda: dependencies.resolve('us-east-1'), options.runs)
+    print("{:28} {:8.1f}ms".format('resolve in order', elapsed * 1000))
+
+    if ordered != aws_parsecf.resolve(template, 'us-east-1'):
+        sys.exit("FAIL: results differ")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Explosion of a template dominated by single-key property maps (plain data), through the intrinsic dispatch
+table compared with trying Functions.evaluate and Conditions.evaluate and catching their KeyErrors.
+
+    python benchmarks/dispatch.py [--resources 2000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from aws_parsecf.common import DELETE
+from aws_parsecf.parser import Parser
+
+class FallthroughParser(Parser):
+    """
+    Intrinsic detection as it was before the dispatch table.
+    """
+
+    def _explode_object(self, current):
+        condition_name = current.get('Condition')
+        if condition_name and isinstance(condition_name, str):
+            if not self.conditions.evaluate(condition_name):
+                return DELETE
+        elif len(current) == 2:
+            key, value = next((key, value) for key, value in current.items() if key != '_exploded')
+            try:
+                return self.functions.evaluate(key, value)
+            except KeyError as e:
+                if e.args != (key,):
+                    raise
+            if key != 'Condition':
+                try:
+                    return self.conditions.evaluate({key: value})
+                except KeyError as e:
+                    if e.args != (key,):
+                        raise
+
+def generate(resources):
+    return {'Resources': dict(("Volume{}".format(index), {
+        'Type': 'AWS::EC2::Instance',
+        'Properties': {
+            'BlockDeviceMappings': [{'Ebs': {'VolumeSize': 8}} for _ in range(5)],
+            'CreditSpecification': {'CPUCredits': 'standard'},
+            'LaunchTemplate': {'LaunchTemplateName': 'template'},
+            'Monitoring': {'Enabled': True},
+            'Tags': [{'Name': {'Value': "instance-{}".format(index)}}],
+            'UserData': {'Fn::Base64': 'echo hello'},
+        },
+    }) for index in range(resources))}
+
+def measure(parser_class, resources, runs):
+    timings = []
+    for _ in range(runs):
+        template = generate(resources)
+        start = time.process_time()
+        parser = parser_class(template, 'us-east-1')
+        parser.explode(template)
+        timings.append(time.process_time() - start)
+    parser.cleanup(template)
+    return min(timings), template
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--resources', type=int, default=2000)
+    arguments.add_argument('--runs', type=int, default=5)
+    options = arguments.parse_args()
+
+    results = []
+    for parser_class in (FallthroughParser, Parser):
+        elapsed, template = measure(parser_class, options.resources, options.runs)
+        results.append(template)
+        print("{:20} {:8.1f}ms (best of {})".format(parser_class.__name__, elapsed * 1000, options.runs))
+
+    if results[0] != results[1]:
+        sys.exit("FAIL: results differ")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Compares the in-place explode + cleanup engine with the single pass, non-mutating resolve engine.
+
+    python benchmarks/engine.py [--resources 5000] [--runs 5]
+"""
+
+import argparse
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from aws_parsecf.parser import Parser
+from templates import generate
+
+# AWS::NoValue within intrinsic function arguments, which both engines remove before the function gets them except
+# from its own (positional) argument list
+NO_VALUE_ARGUMENTS = {
+    'Conditions': {'Never': {'Fn::Equals': [1, 2]}},
+    'Outputs': dict((name, {'Value': value}) for name, value in (
+        ('Select', {'Fn::Select': [1, [{'Fn::If': ['Never', 'w', {'Ref': 'AWS::NoValue'}]}, 'x', 'y']]}),
+        ('Join', {'Fn::Join': ['-', [{'Fn::If': ['Never', 'w', {'Ref': 'AWS::NoValue'}]}, 'x', 'y']]}),
+        ('Sub', {'Fn::Sub': ['${A}-${B}', {'A': {'Fn::If': ['Never', 'w', {'Ref': 'AWS::NoValue'}]}, 'B': 'b'}]}),
+        ('If', {'Fn::If': ['Never', 'w', {'Ref': 'AWS::NoValue'}]}))),
+}
+
+def in_place(template):
+    # explode mutates its input, the copy is timed separately
+    template = copy.deepcopy(template)
+    start = time.time()
+    parser = Parser(template, 'us-east-1')
+    parser.explode(template)
+    parser.cleanup(template)
+    return time.time() - start, template
+
+def single_pass(template):
+    start = time.time()
+    resolved = Parser(template, 'us-east-1', in_place=False).resolve(template)
+    return time.time() - start, resolved
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--resources', type=int, default=5000)
+    arguments.add_argument('--runs', type=int, default=5)
+    options = arguments.parse_args()
+
+    template = generate(options.resources)
+    results = {}
+    for engine in (in_place, single_pass):
+        timings = []
+        for _ in range(options.runs):
+            elapsed, results[engine] = engine(template)
+            timings.append(elapsed)
+        print("{:12} {:8.1f}ms (best of {})".format(engine.__name__, min(timings) * 1000, options.runs))
+
+    if results[in_place] != results[single_pass]:
+        sys.exit("FAIL: engines disagree")
+    if in_place(NO_VALUE_ARGUMENTS)[1] != single_pass(NO_VALUE_ARGUMENTS)[1]:
+        sys.exit("FAIL: engines disagree on AWS::NoValue in intrinsic function arguments")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Fn::GetAtt through the per-resource attribute index, compared with searching the resource on every call.
+
+    python benchmarks/get_att.py [--resources 100] [--references 2000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from aws_parsecf.common import UnknownValue
+from aws_parsecf.functions import Functions
+from aws_parsecf.parser import Parser
+
+class SearchingFunctions(Functions):
+    """
+    Fn::GetAtt as it was before the index, a depth first search per call.
+    """
+
+    def fn_get_att(self, value):
+        resource_name, key = value
+        if resource_name in self.root.get('Resources', ()):
+            resource = self.parser.exploded(self.root['Resources'], resource_name)
+            try:
+                return self._find_att(resource, key)
+            except KeyError as e:
+                if e.args != (key,):
+                    raise
+        return UnknownValue("ATT: {}.{}".format(resource_name, key))
+
+    def _find_att(self, current, key):
+        if isinstance(current, dict):
+            if key in current:
+                return current[key]
+            for value in current.values():
+                try:
+                    return self._find_att(value, key)
+                except KeyError as e:
+                    if e.args != (key,):
+                        raise
+        elif isinstance(current, list):
+            for value in current:
+                try:
+                    return self._find_att(value, key)
+                except KeyError as e:
+                    if e.args != (key,):
+                        raise
+        raise KeyError(key)
+
+def generate(resources, references):
+    template = {'Resources': {}, 'Outputs': {}}
+    for index in range(resources):
+        template['Resources']["Table{}".format(index)] = {
+            'Type': 'AWS::DynamoDB::Table',
+            'Properties': {
+                'AttributeDefinitions': [{'AttributeName': "attribute{}".format(attribute), 'AttributeType': 'S'}
+                                         for attribute in range(50)],
+                'GlobalSecondaryIndexes': [{'IndexName': "index{}".format(gsi),
+                                            'KeySchema': [{'AttributeName': "attribute{}".format(gsi), 'KeyType': 'HASH'}],
+                                            'Projection': {'ProjectionType': 'ALL'}}
+                                           for gsi in range(20)],
+                'TableName': "table-{}".format(index),
+                'StreamArn': "arn:aws:dynamodb:us-east-1:123456789012:table/table-{}/stream".format(index),
+            },
+        }
+    for index in range(references):
+        table = "Table{}".format(index % resources)
+        if index % 2:
+            # a real attribute, not in the properties, so the whole resource is searched
+            value = {'Fn::GetAtt': [table, 'Arn']}
+        else:
+            value = {'Fn::Sub': "${" + table + ".StreamArn}/*"}
+        template['Outputs']["Output{}".format(index)] = {'Value': value}
+    return template
+
+def measure(functions_class, template, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.process_time()
+        parser = Parser(template, 'us-east-1', in_place=False)
+        parser.functions = functions_class(parser, template, 'us-east-1')
+        parser.intrinsics.update(parser.functions.handlers)
+        resolved = parser.resolve(template)
+        timings.append(time.process_time() - start)
+    return min(timings), resolved
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--resources', type=int, default=100)
+    arguments.add_argument('--references', type=int, default=2000)
+    arguments.add_argument('--runs', type=int, default=5)
+    options = arguments.parse_args()
+
+    template = generate(options.resources, options.references)
+    results = []
+    for functions_class in (SearchingFunctions, Functions):
+        elapsed, resolved = measure(functions_class, template, options.runs)
+        results.append(resolved)
+        print("{:20} {:8.1f}ms (best of {})".format(functions_class.__name__, elapsed * 1000, options.runs))
+
+    if results[0] != results[1]:
+        sys.exit("FAIL: results differ")
+
+if __name__ == '__main__':
+    main()
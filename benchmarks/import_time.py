@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""
+Measures the cold import time of aws_parsecf, and fails when boto3 gets imported
+eagerly again or the import gets slower than --max-ms.
+
+    python benchmarks/import_time.py [--runs 20] [--max-ms 100]
+"""
+
+import argparse
+import subprocess
+import sys
+
+IMPORT = """
+import sys, time
+start = time.time()
+import {module}
+print((time.time() - start) * 1000)
+print('boto3' in sys.modules)
+"""
+
+def measure(module, runs):
+    timings = []
+    boto3_imported = False
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', IMPORT.format(module=module)]).decode().split()
+        timings.append(float(output[0]))
+        boto3_imported = boto3_imported or output[1] == 'True'
+    timings.sort()
+    return timings[len(timings) // 2], boto3_imported
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--runs', type=int, default=20)
+    arguments.add_argument('--max-ms', type=float, default=100)
+    options = arguments.parse_args()
+
+    median, boto3_imported = measure('aws_parsecf', options.runs)
+    print("import aws_parsecf: {:.1f}ms (median of {})".format(median, options.runs))
+    try:
+        boto3_median, _ = measure('boto3', options.runs)
+        print("import boto3:       {:.1f}ms (median of {})".format(boto3_median, options.runs))
+    except subprocess.CalledProcessError:
+        pass
+
+    if boto3_imported:
+        sys.exit("FAIL: `import aws_parsecf` imported boto3")
+    if median > options.max_ms:
+        sys.exit("FAIL: `import aws_parsecf` took {:.1f}ms > {:.1f}ms".format(median, options.max_ms))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Random small edits to a large template through aws_parsecf.Incremental, checked against resolving the whole
+template again after each edit.
+
+    python benchmarks/incremental.py [--resources 10000] [--edits 100] [--seed 0]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import aws_parsecf
+from templates import generate
+
+def random_edit(template, rng):
+    """
+    A JSON Patch operation touching one of the ways entries depend on each other.
+    """
+
+    names = list(template['Resources'])
+    name = rng.choice(names)
+    resource = template['Resources'][name]
+    kind = rng.randrange(7)
+    if kind == 0:
+        # plain property, possibly read by Fn::GetAtt
+        return {'op': 'replace', 'path': "/Resources/{}/Type".format(name), 'value': rng.choice(
+            ['AWS::S3::Bucket', 'AWS::Lambda::Function', 'AWS::EC2::Instance', 'AWS::IAM::Role'])}
+    elif kind == 1:
+        # new reference to another resource
+        return {'op': 'add', 'path': "/Resources/{}/Properties/Other".format(name),
+                'value': {'Fn::Sub': "${" + rng.choice(names) + ".Type}-" + str(rng.randrange(100))}}
+    elif kind == 2:
+        # conditional or not anymore (not the ones outputs Ref, which fails for removed resources)
+        if any(output['Value'] == {'Ref': name} for output in template['Outputs'].values()):
+            return random_edit(template, rng)
+        if 'Condition' in resource:
+            return {'op': 'remove', 'path': "/Resources/{}/Condition".format(name)}
+        return {'op': 'add', 'path': "/Resources/{}/Condition".format(name), 'value': rng.choice(['IsProd', 'IsDev'])}
+    elif kind == 3:
+        # Fn::If on a condition
+        return {'op': 'add', 'path': "/Resources/{}/Properties/Size".format(name),
+                'value': {'Fn::If': [rng.choice(['IsProd', 'IsDev']), 1, {'Ref': 'AWS::NoValue'}]}}
+    elif kind == 4:
+        # list edit
+        return {'op': 'add', 'path': "/Resources/{}/Properties/Extra".format(name),
+                'value': [{'Ref': 'Prefix'}, {'Fn::GetAtt': [rng.choice(names), 'Type']}]}
+    elif kind == 5:
+        # a parameter, affecting many entries (rarely, these are slow by nature)
+        if rng.randrange(10):
+            return random_edit(template, rng)
+        return {'op': 'replace', 'path': '/Parameters/Environment/Default', 'value': rng.choice(['prod', 'dev'])}
+    # an output
+    return {'op': 'replace', 'path': "/Outputs/{}/Value".format(rng.choice(list(template['Outputs']))),
+            'value': {'Fn::GetAtt': [rng.choice(names), 'Type']}}
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--resources', type=int, default=10000)
+    arguments.add_argument('--edits', type=int, default=100)
+    arguments.add_argument('--seed', type=int, default=0)
+    options = arguments.parse_args()
+
+    rng = random.Random(options.seed)
+    template = generate(options.resources, options.seed)
+    incremental = aws_parsecf.Incremental(template, 'us-east-1')
+
+    timings = []
+    full_timings = []
+    for index in range(options.edits):
+        operation = random_edit(template, rng)
+        start = time.process_time()
+        incremental.patch([operation])
+        timings.append(time.process_time() - start)
+
+        start = time.process_time()
+        expected = aws_parsecf.resolve(template, 'us-east-1')
+        full_timings.append(time.process_time() - start)
+        if incremental.resolved != expected:
+            sys.exit("FAIL: edit {} ({}) differs from a full resolution".format(index, operation))
+
+    timings.sort()
+    print("{} edits of {} resources, all equal to full resolutions".format(options.edits, options.resources))
+    print("incremental: median {:.3f}ms, 90th percentile {:.3f}ms, max {:.1f}ms".format(
+        timings[len(timings) // 2] * 1000, timings[len(timings) * 9 // 10] * 1000, timings[-1] * 1000))
+    print("full:        median {:.1f}ms".format(sorted(full_timings)[len(full_timings) // 2] * 1000))
+
+if __name__ == '__main__':
+    main()
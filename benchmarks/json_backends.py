@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Parsing a large JSON template with each backend: json.load of a text stream (what load_json did), json.loads and
+orjson.loads of the memory mapped file (what load_json_file does, with the garbage collector paused).
+
+    python benchmarks/json_backends.py [--resources 20000]
+"""
+
+import argparse
+import json
+import mmap
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from aws_parsecf import loaders
+from templates import generate
+
+def text_stream(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def mapped(loads):
+    def parse(path):
+        loaders.set_json_backend(loads)
+        try:
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return loaders._parse_json(data)
+        finally:
+            loaders.set_json_backend()
+    return parse
+
+def measure(parse, path, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.process_time()
+        parsed = parse(path)
+        timings.append(time.process_time() - start)
+    return min(timings), parsed
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--resources', type=int, default=20000)
+    arguments.add_argument('--runs', type=int, default=5)
+    options = arguments.parse_args()
+
+    backends = [('json.load(stream)', text_stream), ('json.loads(mmap)', mapped(json.loads))]
+    try:
+        import orjson
+    except ImportError:
+        print("orjson is not installed, skipping it")
+    else:
+        backends.append(('orjson.loads(mmap)', mapped(loaders._orjson_loads(orjson))))
+
+    template = generate(options.resources)
+    descriptor, path = tempfile.mkstemp(suffix='.json')
+    try:
+        with os.fdopen(descriptor, 'w') as f:
+            json.dump(template, f)
+        print("{:.1f}MB of JSON".format(os.path.getsize(path) / 1e6))
+
+        for name, parse in backends:
+            elapsed, parsed = measure(parse, path, options.runs)
+            print("{:20} {:8.1f}ms (best of {})".format(name, elapsed * 1000, options.runs))
+            if parsed != template:
+                sys.exit("FAIL: {} parsed a different template".format(name))
+    finally:
+        os.remove(path)
+
+if __name__ == '__main__':
+    main()
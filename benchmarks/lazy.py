@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Point queries on a large template through a lazy view, compared with resolving the whole template first.
+
+    python benchmarks/lazy.py [--resources 10000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import aws_parsecf
+from templates import generate
+
+def queries(template):
+    # a property of each kind of resource, and an output
+    queries = []
+    for name, resource in template['Resources'].items():
+        if 'Condition' not in resource:
+            queries.append(('Resources', name, 'Properties', sorted(resource['Properties'])[0]))
+        if len(queries) == 4:
+            break
+    queries.append(('Outputs', next(iter(template['Outputs'])), 'Value'))
+    return queries
+
+def lookup(current, path):
+    for key in path:
+        current = current[key]
+    return current
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--resources', type=int, default=10000)
+    arguments.add_argument('--runs', type=int, default=5)
+    options = arguments.parse_args()
+
+    template = generate(options.resources)
+    paths = queries(template)
+
+    timings = {'resolve': [], 'view': []}
+    for _ in range(options.runs):
+        start = time.process_time()
+        resolved = aws_parsecf.resolve(template, 'us-east-1')
+        expected = [lookup(resolved, path) for path in paths]
+        timings['resolve'].append(time.process_time() - start)
+
+        start = time.process_time()
+        viewed = aws_parsecf.view(template, 'us-east-1')
+        values = [lookup(viewed, path) for path in paths]
+        timings['view'].append(time.process_time() - start)
+
+        if values != expected:
+            sys.exit("FAIL: results differ")
+
+    print("{} queries on {} resources".format(len(paths), options.resources))
+    for name, elapsed in timings.items():
+        print("{:8} {:10.3f}ms (best of {})".format(name, min(elapsed) * 1000, options.runs))
+
+if __name__ == '__main__':
+    main()
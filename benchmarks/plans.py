@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Resolving one template for many regions and parameter sets: a compiled plan compared with loading the
+template for each combination.
+
+    python benchmarks/plans.py [--resources 1000] [--regions 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import aws_parsecf
+from templates import REGIONS, generate
+
+PARAMETER_SETS = [{}, {'Environment': 'dev'}, {'Environment': 'prod', 'Prefix': 'other'}]
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--resources', type=int, default=1000)
+    arguments.add_argument('--regions', type=int, default=20)
+    options = arguments.parse_args()
+
+    string = json.dumps(generate(options.resources))
+    combinations = [(region, parameters) for region in REGIONS[:options.regions] for parameters in PARAMETER_SETS]
+
+    start = time.process_time()
+    loaded = [aws_parsecf.loads_json(string, region, parameters) for region, parameters in combinations]
+    load_time = time.process_time() - start
+
+    start = time.process_time()
+    plan = aws_parsecf.compile(json.loads(string))
+    compile_time = time.process_time() - start
+    planned = [plan.resolve(region, parameters) for region, parameters in combinations]
+    plan_time = time.process_time() - start
+
+    print("{} resolutions of {} resources".format(len(combinations), options.resources))
+    print("loads_json each time: {:8.1f}ms".format(load_time * 1000))
+    print("compile + resolve:    {:8.1f}ms (compile {:.1f}ms), {:.1f}x".format(
+        plan_time * 1000, compile_time * 1000, load_time / plan_time))
+
+    if loaded != planned:
+        sys.exit("FAIL: results differ")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Peak RSS of resolving growing JSON templates whole (load_json_file) against streaming their resources
+(iter_resources_file, each resource discarded once consumed), each run in a fresh process.
+
+    python benchmarks/streaming.py [--resources 2000 8000 32000]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from aws_parsecf import load_json_file, resolve
+from aws_parsecf.streaming import iter_resources_file
+from templates import generate
+
+def whole(path):
+    return len(load_json_file(path, 'us-east-1')['Resources'])
+
+def streamed(path):
+    count = 0
+    for name, resolved in iter_resources_file(path, 'us-east-1'):
+        count += 1
+    return count
+
+MODES = {'load_json_file': whole, 'iter_resources_file': streamed}
+
+def write(count, path):
+    with open(path, 'w') as f:
+        json.dump(generate(int(count)), f)
+
+def child(mode, path):
+    start = time.process_time()
+    count = MODES[mode](path)
+    elapsed = time.process_time() - start
+    # kilobytes on Linux
+    print(json.dumps({'resources': count, 'seconds': elapsed,
+                      'peak': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0}))
+
+def run(*arguments):
+    # fresh processes, as the peak RSS carries over to subprocesses started by a process that grew
+    return subprocess.check_output([sys.executable, os.path.abspath(__file__)] + list(arguments)).decode()
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--resources', type=int, nargs='+', default=[2000, 8000, 32000])
+    arguments.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    arguments.add_argument('--write', nargs=2, help=argparse.SUPPRESS)
+    options = arguments.parse_args()
+    if options.child:
+        child(*options.child)
+        return
+    if options.write:
+        write(*options.write)
+        return
+
+    # the same resources both ways
+    template = generate(200)
+    descriptor, path = tempfile.mkstemp(suffix='.json')
+    try:
+        with os.fdopen(descriptor, 'w') as f:
+            json.dump(template, f)
+        if dict(iter_resources_file(path, 'us-east-1')) != resolve(template, 'us-east-1')['Resources']:
+            sys.exit("FAIL: iter_resources_file resolved different resources")
+    finally:
+        os.remove(path)
+
+    peaks = dict((mode, []) for mode in MODES)
+    print("{:>10} {:>8} {:>22} {:>22}".format('resources', 'MB', 'load_json_file', 'iter_resources_file'))
+    for count in options.resources:
+        descriptor, path = tempfile.mkstemp(suffix='.json')
+        os.close(descriptor)
+        try:
+            run('--write', str(count), path)
+            results = dict((mode, json.loads(run('--child', mode, path))) for mode in MODES)
+            size = os.path.getsize(path) / 1e6
+        finally:
+            os.remove(path)
+        for mode, result in results.items():
+            peaks[mode].append(result['peak'])
+        print("{:>10} {:>8.1f} {:>22} {:>22}".format(count, size, *[
+            "{:7.1f}MB {:7.1f}ms".format(results[mode]['peak'], results[mode]['seconds'] * 1000) for mode in MODES]))
+
+    growth = dict((mode, values[-1] - values[0]) for mode, values in peaks.items())
+    print("peak RSS growth: load_json_file {:.1f}MB, iter_resources_file {:.1f}MB".format(
+        growth['load_json_file'], growth['iter_resources_file']))
+    if len(options.resources) > 1 and growth['iter_resources_file'] > growth['load_json_file'] / 4:
+        sys.exit("FAIL: streaming peak RSS grew with the resources")
+
+if __name__ == '__main__':
+    main()
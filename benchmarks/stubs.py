@@ -0,0 +1,72 @@
+"""
+Stub boto3 clients, so Fn::GetAZs, Fn::ImportValue and the configured region resolve offline, without credentials,
+at a steady speed.
+"""
+
+import contextlib
+import sys
+import time
+import types
+
+# seconds each call takes, like a round trip to AWS
+LATENCY = 0
+
+class EC2Client:
+    def __init__(self, region_name):
+        self.region_name = region_name
+
+    def describe_availability_zones(self, **kwargs):
+        time.sleep(LATENCY)
+        return {'AvailabilityZones': [{'ZoneName': self.region_name + letter, 'State': 'available'}
+                                      for letter in 'abc']}
+
+class CloudFormationClient:
+    # exports per page, like the real ListExports
+    PAGE_SIZE = 100
+
+    def __init__(self, region_name, exports=250):
+        self.region_name = region_name
+        self.exports = exports
+
+    def list_exports(self, NextToken=None):
+        time.sleep(LATENCY)
+        start = int(NextToken or 0)
+        end = min(start + CloudFormationClient.PAGE_SIZE, self.exports)
+        response = {'Exports': [{'Name': "Export{}".format(index), 'Value': "{}-value-{}".format(self.region_name, index),
+                                 'ExportingStackId': 'arn:aws:cloudformation:{}:123456789012:stack/exporter/1'.format(
+                                     self.region_name)}
+                                for index in range(start, end)]}
+        if end < self.exports:
+            response['NextToken'] = str(end)
+        return response
+
+CLIENTS = {'ec2': EC2Client, 'cloudformation': CloudFormationClient}
+
+class Session:
+    def __init__(self, region_name='us-east-1', **kwargs):
+        self.region_name = region_name
+
+    def client(self, service_name, region_name=None, **kwargs):
+        return CLIENTS[service_name](region_name or self.region_name)
+
+def client(service_name, region_name=None, **kwargs):
+    return Session().client(service_name, region_name)
+
+@contextlib.contextmanager
+def stubbed_boto3():
+    """
+    `import boto3` gives this module's stubs within the block.
+    """
+
+    stub = types.ModuleType('boto3')
+    stub.client = client
+    stub.Session = Session
+    original = sys.modules.get('boto3')
+    sys.modules['boto3'] = stub
+    try:
+        yield stub
+    finally:
+        if original is None:
+            del sys.modules['boto3']
+        else:
+            sys.modules['boto3'] = original
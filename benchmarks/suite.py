@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+"""
+Throughput and peak memory of the parser's hot paths on synthetic templates, compared with stored baselines.
+
+    python benchmarks/suite.py [--runs 10] [--scenario resolve ...] [--save] [--check] [--tolerance 0.25]
+
+Each scenario resolves a template from templates.generate (resources, nesting depth, Fn::Sub / Fn::GetAtt
+density, unknown attributes, conditions, lookups) through one entry point; AWS lookups go to the stub clients of stubs.py. Reported:
+ops/sec of the best of --runs, the score (the median of runs per unit of a fixed plain Python workload timed
+right before each, which is what's compared as CPU speed varies between machines and over time), and the peak of
+memory allocated by Python during one run (tracemalloc). baseline.json holds the results of --save, --check fails
+when a scenario's score or memory got worse than --tolerance.
+"""
+
+import argparse
+import atexit
+import copy
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import aws_parsecf
+from aws_parsecf.lookups import AvailabilityZonesCache, ExportsCache, Lookups
+from aws_parsecf.parser import Parser
+from stubs import stubbed_boto3
+from templates import generate
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# each operation takes the template and returns (prepare, run): prepare() isn't timed, its result is given to
+# run(), which returns the resolved template
+def in_place(template):
+    def run(copied):
+        parser = Parser(copied, 'us-east-1')
+        parser.explode(copied)
+        parser.cleanup(copied)
+        return copied
+    return lambda: copy.deepcopy(template), run
+
+def single_pass(template):
+    return lambda: None, lambda _: aws_parsecf.resolve(template, 'us-east-1')
+
+def with_lookups(template):
+    # fresh caches, so every run fetches from the stub clients
+    def prepare():
+        return Lookups(availability_zones_cache=AvailabilityZonesCache(), exports_cache=ExportsCache())
+    return prepare, lambda lookups: aws_parsecf.resolve(template, 'us-east-1', lookups=lookups)
+
+def loads_json(template):
+    string = json.dumps(template)
+    return lambda: None, lambda _: aws_parsecf.loads_json(string, 'us-east-1')
+
+def loads_json_cached(template):
+    # warmed up, so every run is a hit of the memory tier
+    string = json.dumps(template)
+    cache = aws_parsecf.ResultCache()
+    aws_parsecf.loads_json(string, 'us-east-1', cache=cache)
+    return lambda: None, lambda _: aws_parsecf.loads_json(string, 'us-east-1', cache=cache)
+
+def load_json_file(template):
+    descriptor, path = tempfile.mkstemp(suffix='.json')
+    with os.fdopen(descriptor, 'w') as f:
+        json.dump(template, f)
+    atexit.register(os.remove, path)
+    return lambda: None, lambda _: aws_parsecf.load_json_file(path, 'us-east-1')
+
+def load_yaml(template):
+    import yaml
+    string = yaml.safe_dump(template)
+    return lambda: None, lambda _: aws_parsecf.load_yaml(string, 'us-east-1')
+
+# (name, generate arguments, operation)
+SCENARIOS = [
+    ('explode-cleanup', {'resources': 1000}, in_place),
+    ('resolve', {'resources': 1000}, single_pass),
+    ('resolve-10k', {'resources': 10000}, single_pass),
+    ('explode-deep', {'resources': 200, 'depth': 100}, in_place),
+    ('resolve-deep', {'resources': 200, 'depth': 100}, single_pass),
+    ('sub-dense', {'resources': 500, 'subs': 10}, single_pass),
+    ('get-att-dense', {'resources': 500, 'get_atts': 10}, single_pass),
+    ('unknown-dense', {'resources': 1000, 'unknowns': 20}, single_pass),
+    ('conditions', {'resources': 1000, 'conditions': 300}, single_pass),
+    ('lookups', {'resources': 1000, 'lookups': True}, with_lookups),
+    ('loads-json', {'resources': 1000}, loads_json),
+    ('loads-json-cached', {'resources': 1000}, loads_json_cached),
+    ('load-json-file', {'resources': 1000}, load_json_file),
+    ('load-yaml', {'resources': 300}, load_yaml),
+]
+
+def calibration():
+    # a fixed amount of plain Python work, timed next to each run as the unit of the scores
+    start = time.process_time()
+    values = {}
+    for index in range(50000):
+        values[index % 1000] = [index, str(index)]
+    return time.process_time() - start
+
+def measure(operation, template, runs):
+    prepare, run = operation(template)
+    timings = []
+    scores = []
+    for _ in range(runs):
+        prepared = prepare()
+        unit = calibration()
+        start = time.process_time()
+        result = run(prepared)
+        timings.append(time.process_time() - start)
+        scores.append(unit / max(timings[-1], 1e-9))
+
+    prepared = prepare()
+    tracemalloc.start()
+    try:
+        run(prepared)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    scores.sort()
+    return {'ops_per_sec': _rounded(1 / max(min(timings), 1e-9)), 'score': _rounded(scores[len(scores) // 2]),
+            'peak_mb': _rounded(peak / 1e6)}, result
+
+def _rounded(value):
+    # to 4 significant digits, more is noise
+    return float('{:.4g}'.format(value))
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--runs', type=int, default=10)
+    arguments.add_argument('--scenario', nargs='+', choices=[name for name, _, _ in SCENARIOS],
+                           help="only these (all by default)")
+    arguments.add_argument('--save', action='store_true', help="store the results as the new baseline")
+    arguments.add_argument('--check', action='store_true', help="fail on regressions from the baseline")
+    arguments.add_argument('--tolerance', type=float, default=0.25,
+                           help="relative slowdown / memory growth reported as a regression")
+    options = arguments.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE) as f:
+            baseline = json.load(f)['scenarios']
+
+    results = {}
+    regressions = []
+    print("{:16} {:>10} {:>9} {:>9} {:>9} {:>9}".format(
+            'scenario', 'ops/sec', 'score', 'peak MB', 'vs score', 'vs MB'))
+    with stubbed_boto3():
+        for name, parameters, operation in SCENARIOS:
+            if options.scenario and name not in options.scenario:
+                continue
+            try:
+                template = generate(**parameters)
+                results[name], result = measure(operation, template, options.runs)
+            except ImportError as e:
+                print("{:16} skipped, {}".format(name, e))
+                continue
+            expected = aws_parsecf.resolve(template, 'us-east-1', lookups=Lookups(
+                    availability_zones_cache=AvailabilityZonesCache(), exports_cache=ExportsCache()))
+            if result != expected:
+                sys.exit("FAIL: {} resolved a different template".format(name))
+
+            current, previous = results[name], baseline.get(name)
+            changes = ['', '']
+            if previous:
+                speed = current['score'] / previous['score'] - 1
+                memory = current['peak_mb'] / previous['peak_mb'] - 1
+                changes = ["{:+.0%}".format(speed), "{:+.0%}".format(memory)]
+                if speed < -options.tolerance or memory > options.tolerance:
+                    regressions.append(name)
+            print("{:16} {:>10.2f} {:>9.4g} {:>9.1f} {:>9} {:>9}".format(
+                    name, current['ops_per_sec'], current['score'], current['peak_mb'], *changes))
+
+    if options.save:
+        baseline.update(results)
+        with open(BASELINE, 'w') as f:
+            json.dump({'python': platform.python_version(), 'scenarios': baseline}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print("saved to {}".format(BASELINE))
+    if regressions:
+        message = "regressions beyond {:.0%}: {}".format(options.tolerance, ', '.join(regressions))
+        if options.check:
+            sys.exit("FAIL: " + message)
+        print(message)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Synthetic CloudFormation templates for the benchmarks.
+"""
+
+import random
+
+REGIONS = ['us-east-1', 'us-east-2', 'us-west-1', 'us-west-2', 'ca-central-1', 'eu-west-1', 'eu-west-2', 'eu-west-3',
+           'eu-central-1', 'eu-north-1', 'ap-south-1', 'ap-northeast-1', 'ap-northeast-2', 'ap-northeast-3',
+           'ap-southeast-1', 'ap-southeast-2', 'sa-east-1', 'me-south-1', 'af-south-1', 'ap-east-1']
+
+def generate(resources=1000, seed=0, depth=0, subs=0, get_atts=0, unknowns=0, conditions=0, lookups=False):
+    """
+    A template with `resources` resources mixing plain properties, Ref, Fn::GetAtt, Fn::Sub, Fn::If and
+    conditional resources. On top of that, each resource may get:
+
+    - depth: a Metadata property nested that deep, ending with intrinsic functions
+    - subs: Fn::Sub properties, each with a few Ref / Fn::GetAtt / explicit variables
+    - get_atts: Fn::GetAtt properties, of earlier resources
+    - unknowns: Fn::GetAtt properties of attributes only known once deployed (Arn...), of earlier resources
+    - lookups: Fn::GetAZs and Fn::ImportValue properties (see stubs.py to resolve them offline)
+
+    and `conditions` more conditions, combining the parameters and each other, which resources use as their
+    Condition or in Fn::If. The same arguments always give the same template.
+    """
+
+    rng = random.Random(seed)
+    template = {
+        'Parameters': {
+            'Environment': {'Type': 'String', 'Default': 'prod', 'AllowedValues': ['prod', 'dev']},
+            'Prefix': {'Type': 'String', 'Default': 'bench'},
+        },
+        'Mappings': {
+            'RegionMap': dict((region, {'AMI': "ami-{:08x}".format(rng.getrandbits(32))}) for region in REGIONS),
+        },
+        'Conditions': {
+            'IsProd': {'Fn::Equals': [{'Ref': 'Environment'}, 'prod']},
+            'IsDev': {'Fn::Not': [{'Condition': 'IsProd'}]},
+        },
+        'Resources': {},
+        'Outputs': {},
+    }
+
+    names = []
+    unconditional = []
+    for index in range(resources):
+        name = "Resource{}".format(index)
+        kind = rng.randrange(4)
+        if kind == 0:
+            resource = {
+                'Type': 'AWS::S3::Bucket',
+                'Properties': {
+                    'BucketName': {'Fn::Sub': '${Prefix}-bucket-' + str(index) + '-${AWS::Region}'},
+                    'Tags': [{'Key': 'Environment', 'Value': {'Ref': 'Environment'}},
+                             {'Key': 'Index', 'Value': str(index)}],
+                    'VersioningConfiguration': {'Status': 'Enabled'},
+                },
+            }
+        elif kind == 1:
+            resource = {
+                'Type': 'AWS::Lambda::Function',
+                'Properties': {
+                    'FunctionName': {'Fn::Join': ['-', [{'Ref': 'Prefix'}, 'function', str(index)]]},
+                    'Runtime': 'python3.6',
+                    'MemorySize': {'Fn::If': ['IsProd', 1024, 128]},
+                    'Environment': {'Variables': {'INDEX': str(index), 'STAGE': {'Ref': 'Environment'}}},
+                    'VpcConfig': {'SubnetIds': [
+                        {'Fn::If': ['IsProd', 'subnet-{}'.format(subnet), {'Ref': 'AWS::NoValue'}]}
+                        for subnet in range(4)]},
+                },
+            }
+        elif kind == 2:
+            resource = {
+                'Type': 'AWS::EC2::Instance',
+                'Condition': 'IsDev' if index % 2 else 'IsProd',
+                'Properties': {
+                    'ImageId': {'Fn::FindInMap': ['RegionMap', {'Ref': 'AWS::Region'}, 'AMI']},
+                    'InstanceType': 't2.micro',
+                    'BlockDeviceMappings': [{'DeviceName': '/dev/sd{}'.format(letter), 'Ebs': {'VolumeSize': 8}}
+                                            for letter in 'bcd'],
+                },
+            }
+        else:
+            resource = {
+                'Type': 'AWS::IAM::Role',
+                'Properties': {
+                    'RoleName': {'Fn::Sub': 'role-' + str(index)},
+                    'AssumeRolePolicyDocument': {
+                        'Version': '2012-10-17',
+                        'Statement': [{'Effect': 'Allow',
+                                       'Principal': {'Service': ['lambda.amazonaws.com']},
+                                       'Action': ['sts:AssumeRole']}],
+                    },
+                },
+            }
+            if names:
+                target = rng.choice(names)
+                resource['Properties']['Description'] = {'Fn::GetAtt': [target, 'Type']}
+        properties = resource['Properties']
+        if depth:
+            properties['Metadata'] = _nested(depth, index)
+        for sub in range(subs):
+            properties["Sub{}".format(sub)] = {'Fn::Sub': [
+                '${Prefix}-${AWS::Region}-${Local}' + ('-${{{}.Arn}}'.format(rng.choice(names)) if names else ''),
+                {'Local': "{}-{}".format(index, sub)}]}
+        for get_att in range(get_atts if names else 0):
+            properties["GetAtt{}".format(get_att)] = {'Fn::GetAtt': [rng.choice(names), 'Type']}
+        for unknown in range(unknowns if names else 0):
+            properties["Unknown{}".format(unknown)] = {'Fn::GetAtt': [rng.choice(names), rng.choice(['Arn', 'Id'])]}
+        if lookups:
+            properties['Zone'] = {'Fn::Select': [index % 2, {'Fn::GetAZs': ''}]}
+            properties['Import'] = {'Fn::ImportValue': "Export{}".format(index % 20)}
+        if conditions:
+            condition = "Condition{}".format(rng.randrange(conditions))
+            if 'Condition' in resource:
+                properties['Conditional'] = {'Fn::If': [condition, 'yes', {'Ref': 'AWS::NoValue'}]}
+            else:
+                resource['Condition'] = condition
+        template['Resources'][name] = resource
+        names.append(name)
+        if 'Condition' not in resource:
+            unconditional.append(name)
+
+    for index in range(conditions):
+        condition = {'Fn::Equals': [{'Ref': 'Environment'}, rng.choice(['prod', 'dev'])]}
+        if index:
+            other = {'Condition': "Condition{}".format(rng.randrange(index))}
+            condition = [{'Fn::And': [condition, other]}, {'Fn::Or': [condition, other]},
+                         {'Fn::Not': [other]}][index % 3]
+        template['Conditions']["Condition{}".format(index)] = condition
+
+    for name in unconditional[:50]:
+        template['Outputs'][name] = {'Value': {'Ref': name}}
+    return template
+
+def _nested(depth, index):
+    node = {'Fn::Join': ['-', [{'Ref': 'Prefix'}, {'Ref': 'AWS::Region'}, str(index)]]}
+    for level in range(depth):
+        node = {"Level{}".format(level): node, 'Items': [level, {'Ref': 'Environment'}]}
+    return node
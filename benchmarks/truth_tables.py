@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+Which resources exist under every combination of regions and AllowedValues: truth_tables() compared with
+evaluating the conditions once per combination.
+
+    python benchmarks/truth_tables.py [--parameters 4] [--values 4] [--regions 20] [--conditions 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import aws_parsecf
+from aws_parsecf.loaders import conditions
+from templates import REGIONS
+
+def generate(parameters, values, conditions, resources, seed=0):
+    rng = random.Random(seed)
+    template = {'Parameters': {}, 'Mappings': {'RegionMap': {}}, 'Conditions': {}, 'Resources': {}}
+    for parameter in range(parameters):
+        template['Parameters']["P{}".format(parameter)] = {
+            'Type': 'String', 'AllowedValues': ["v{}".format(value) for value in range(values)]}
+    for region in REGIONS:
+        template['Mappings']['RegionMap'][region] = {'Tier': rng.choice(['gold', 'silver'])}
+    for index in range(conditions):
+        kind = rng.randrange(5) if index > 1 else 0
+        if kind == 0:
+            condition = {'Fn::Equals': [{'Ref': "P{}".format(rng.randrange(parameters))}, "v{}".format(rng.randrange(values))]}
+        elif kind == 1:
+            condition = {'Fn::Equals': [{'Fn::FindInMap': ['RegionMap', {'Ref': 'AWS::Region'}, 'Tier']}, 'gold']}
+        elif kind == 2:
+            condition = {'Fn::Not': [{'Condition': "C{}".format(rng.randrange(index))}]}
+        elif kind == 3:
+            condition = {'Fn::And': [{'Condition': "C{}".format(rng.randrange(index))} for _ in range(2)]}
+        else:
+            condition = {'Fn::Or': [{'Condition': "C{}".format(rng.randrange(index))},
+                                    {'Fn::Equals': [{'Ref': "P{}".format(rng.randrange(parameters))}, 'v0']}]}
+        template['Conditions']["C{}".format(index)] = condition
+    for index in range(resources):
+        template['Resources']["Resource{}".format(index)] = {
+            'Type': 'AWS::SNS::Topic', 'Condition': "C{}".format(rng.randrange(conditions))}
+    return template
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--parameters', type=int, default=4)
+    arguments.add_argument('--values', type=int, default=4)
+    arguments.add_argument('--regions', type=int, default=20)
+    arguments.add_argument('--conditions', type=int, default=200)
+    arguments.add_argument('--resources', type=int, default=1000)
+    options = arguments.parse_args()
+
+    template = generate(options.parameters, options.values, options.conditions, options.resources)
+    regions = REGIONS[:options.regions]
+
+    start = time.process_time()
+    tables = aws_parsecf.truth_tables(template, regions)
+    tables_time = time.process_time() - start
+
+    start = time.process_time()
+    expected = [conditions(template, region, parameters) for region, parameters in tables.assignments]
+    each_time = time.process_time() - start
+
+    print("{} combinations, {} conditions, {} resources".format(
+        len(tables.assignments), options.conditions, options.resources))
+    print("conditions() per combination: {:8.1f}ms".format(each_time * 1000))
+    print("truth_tables():               {:8.1f}ms, {:.1f}x".format(tables_time * 1000, each_time / tables_time))
+
+    for index, values in enumerate(expected):
+        for name, value in values.items():
+            if bool(tables.conditions[name] >> index & 1) != value:
+                sys.exit("FAIL: {} differs for {}".format(name, tables.assignments[index]))
+        for name, resource in template['Resources'].items():
+            if bool(tables.resources[name] >> index & 1) != values[resource['Condition']]:
+                sys.exit("FAIL: {} differs for {}".format(name, tables.assignments[index]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""
+Memory of resolving a template where most Fn::GetAtt are of attributes only known once deployed (UnknownValue),
+peak and retained by the result (tracemalloc), and how many distinct objects its unknowns are.
+
+    python benchmarks/unknowns.py [--resources 5000] [--unknowns 20]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from aws_parsecf import resolve
+from aws_parsecf.common import UnknownValue
+from templates import generate
+
+def unknowns(node):
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, UnknownValue):
+            yield current
+        elif isinstance(current, dict):
+            stack.extend(current.values())
+        elif isinstance(current, list):
+            stack.extend(current)
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--resources', type=int, default=5000)
+    arguments.add_argument('--unknowns', type=int, default=20)
+    options = arguments.parse_args()
+
+    template = generate(options.resources, unknowns=options.unknowns)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        resolved = resolve(template, 'us-east-1')
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    values = list(unknowns(resolved))
+    objects = len(set(id(value) for value in values))
+    keys = len(set(value.key for value in values))
+    print("{} unknowns, {} distinct objects of {} keys; peak {:.1f}MB, retained {:.1f}MB".format(
+            len(values), objects, keys, (peak - before) / 1e6, (retained - before) / 1e6))
+    if objects > keys:
+        sys.exit("FAIL: the same unknown values are different objects")
+    if hasattr(values[0], '__dict__'):
+        sys.exit("FAIL: unknown values have a __dict__")
+
+if __name__ == '__main__':
+    main()
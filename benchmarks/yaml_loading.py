@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Loading a large short form YAML template with LibYAML (when PyYAML was built with it) compared with the pure
+Python loader.
+
+    python benchmarks/yaml_loading.py [--resources 5000]
+"""
+
+import argparse
+import os
+import sys
+import time
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from aws_parsecf import yaml_loader
+from aws_parsecf.plans import INTRINSICS
+from templates import generate
+
+class ShortFormDumper(yaml.SafeDumper):
+    """
+    Dumps intrinsic functions in their short forms, like templates are usually written.
+    """
+
+    def represent_dict(self, data):
+        if len(data) == 1:
+            function_type, value = next(iter(data.items()))
+            if function_type in INTRINSICS or function_type == 'Condition':
+                tag = yaml_loader._short_form(function_type)
+                if isinstance(value, list):
+                    return self.represent_sequence(tag, value)
+                elif isinstance(value, dict):
+                    return self.represent_mapping(tag, value)
+                return self.represent_scalar(tag, value)
+        return yaml.SafeDumper.represent_dict(self, data)
+
+ShortFormDumper.add_representer(dict, ShortFormDumper.represent_dict)
+
+class PureLoader(yaml.SafeLoader):
+    pass
+
+for tag, constructor in yaml_loader.Loader.yaml_constructors.items():
+    if isinstance(tag, str) and tag.startswith('!'):
+        PureLoader.add_constructor(tag, constructor)
+
+def measure(loader, string, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.process_time()
+        loaded = yaml.load(string, Loader=loader)
+        timings.append(time.process_time() - start)
+    return min(timings), loaded
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument('--resources', type=int, default=5000)
+    arguments.add_argument('--runs', type=int, default=3)
+    options = arguments.parse_args()
+
+    template = generate(options.resources)
+    string = yaml.dump(template, Dumper=ShortFormDumper, default_flow_style=False)
+    print("{:.1f}MB of YAML, LibYAML {}".format(len(string) / 1e6, 'available' if yaml.__with_libyaml__ else 'missing'))
+
+    results = []
+    for name, loader in (('pure Python', PureLoader), ('yaml_loader.Loader', yaml_loader.Loader)):
+        elapsed, loaded = measure(loader, string, options.runs)
+        results.append(loaded)
+        print("{:20} {:8.1f}ms (best of {})".format(name, elapsed * 1000, options.runs))
+
+    if not results[0] == results[1] == template:
+        sys.exit("FAIL: results differ")
+
+if __name__ == '__main__':
+    main()
@@ -11,16 +11,29 @@ setup(
     author_email='oded.niv@gmail.com',
     url='https://github.com/puresec/aws-parsecf',
     packages=find_packages(exclude=['tests*']),
+    python_requires='>=3.10',
+    entry_points={
+        'console_scripts': ['aws-parsecf = aws_parsecf.cli:main'],
+    },
     install_requires=[
         'PyYAML',
         'boto3',
     ],
+    extras_require={
+        'fast': ['orjson'],
+    },
     setup_requires=['nose'],
     tests_require=['coverage'],
 
     license='MIT',
     classifiers=[
         'License :: OSI Approved :: MIT License',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
+        'Programming Language :: Python :: 3.12',
+        'Programming Language :: Python :: 3.13',
+        'Programming Language :: Python :: 3.14',
     ],
 )
 